@@ -1,14 +1,16 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-import os, openai, textwrap, random, importlib, logging
+import os, openai, textwrap, random, logging, hashlib
 import time
-icon = importlib.import_module('gfx.' + os.getenv('LOGO_IMG'))
+from gfx.assets import load_logo
+icon = load_logo(os.getenv('LOGO_IMG'))
 
 from functools import partial
-from lcd.lcd_menu_screen import Menu, MenuAction, MenuNoop, MenuScreen
+from lcd.lcd_menu_screen import Menu, MenuAction, MenuNoop, MenuScreen, build_menu
 from tenacity import retry, stop_after_attempt, wait_random, stop_after_delay
 from ast import literal_eval
+from printing import ReceiptCompiler, CompiledSegment
 #from adafruit.Adafruit_Thermal import *
 
 # OpenTelemetry imports
@@ -28,6 +30,15 @@ class Baiiab:
     def __init__(self, printer = None, oai_client = None):
         self._printer = printer
         self._oai_client = oai_client
+        self._receipts = None
+        if printer:
+            self._receipts = ReceiptCompiler(
+                printer,
+                # The logo's bitmap, not just its name: replacing the image
+                # in gfx/ must recompile the header too
+                key_parts=(os.getenv('LOGO_IMG'), os.getenv('TITLE'), icon.width,
+                           hashlib.sha1(bytes(icon.data)).hexdigest()),
+                cache_dir=os.getenv('RECEIPT_CACHE_DIR', 'cache/receipts'))
         
         # Initialize telemetry
         if OTEL_AVAILABLE:
@@ -70,6 +81,26 @@ class Baiiab:
                 description="Number of completion tokens generated",
                 unit="tokens"
             )
+            self.printer_wait_histogram = self.meter.create_histogram(
+                "baiiab.printer.wait_time",
+                description="Time spent waiting on the printer throttle per print job",
+                unit="ms"
+            )
+            self.printer_write_histogram = self.meter.create_histogram(
+                "baiiab.printer.write_time",
+                description="Time spent writing to the printer per print job",
+                unit="ms"
+            )
+            self.printer_bytes_counter = self.meter.create_counter(
+                "baiiab.printer.bytes_sent",
+                description="Number of bytes sent to the printer",
+                unit="By"
+            )
+            self.printer_status_counter = self.meter.create_counter(
+                "baiiab.printer.status_round_trips",
+                description="Number of printer status queries used for flow control",
+                unit="1"
+            )
         else:
             self.tracer = None
             self.meter = None
@@ -94,17 +125,14 @@ class Baiiab:
                 offline_advice = literal_eval(f.read())
             return random.choice(offline_advice)
 
-    def get_menu(self, callback):
+    def get_menu(self, callback, columns=None, rows=None):
+        """Builds the menu tree from conf/menu.json, where a dict is a menu
+        (nested as deep as needed) and a list of chat messages an action
+        (see lcd.lcd_menu_screen.build_menu()).
+        """
         with open("conf/menu.json","r") as f:
             menu_data = literal_eval(f.read())
-        full_menu = []
-        for menu_folder in menu_data:
-            menu_options = []
-            for menu_action in menu_data[menu_folder]:
-                messages = menu_data[menu_folder][menu_action]
-                menu_options.append(MenuAction(menu_action, callback=partial(callback, messages)))
-            full_menu.append(Menu(menu_folder, options=menu_options))
-        return full_menu
+        return build_menu(menu_data, callback, columns, rows)
 
 
     def print_thinking(self):
@@ -119,9 +147,22 @@ class Baiiab:
     def print_offline(self):
         self._printer.println("...")
 
+    def record_print_stats(self, receipt):
+        stats = self._printer.getStats()
+        wait_ms = stats['wait_time'] * 1000
+        write_ms = stats['write_time'] * 1000
+        logging.info(f'record_print_stats({receipt})::wait_ms={wait_ms:.1f};write_ms={write_ms:.1f};'
+                     f'bytes_sent={stats["bytes_sent"]};status_round_trips={stats["status_round_trips"]}')
+        if self.meter:
+            self.printer_wait_histogram.record(wait_ms, {"receipt": receipt})
+            self.printer_write_histogram.record(write_ms, {"receipt": receipt})
+            self.printer_bytes_counter.add(stats["bytes_sent"], {"receipt": receipt})
+            self.printer_status_counter.add(stats["status_round_trips"], {"receipt": receipt})
+
     def print_advice_short(self, advice, topic = None):
         logging.info("print_advice_small(" + advice + ")")
         #self.print_thinking()
+        self._printer.resetStats()
         self._printer.setDefault()
         if topic:
             self._printer.justify('C')
@@ -135,6 +176,7 @@ class Baiiab:
         content = self.prepare_advice_for_printer(advice)
         self._printer.println(content)
         self._printer.feed(5)
+        self.record_print_stats("short")
 
     def cleanse_advice(self, advice):
         # It seems to like to start responses with: ".\n\n"
@@ -150,9 +192,9 @@ class Baiiab:
             lines.append("\n".join(textwrap.wrap(line, 30)))
         return "\n".join(lines)
 
-    def print_advice_long(self, advice, topic = None):
-        logging.info(topic)
-        logging.info(advice)
+    # Static receipt segments.  These are compiled into byte blobs
+    # once (see printing.receipt) and replayed by print_advice_long().
+    def print_receipt_header(self):
         self._printer.setDefault() # Restore printer to defaults
         # Centered but lighter
         self._printer.printBitmap(icon.width, icon.height, icon.data)
@@ -168,17 +210,7 @@ class Baiiab:
         self._printer.feed(1)
         self._printer.doubleHeightOff()
 
-        if topic:
-            self._printer.justify('C')
-            self._printer.doubleHeightOn()
-            self._printer.println("Your " + topic)
-            self._printer.doubleHeightOff()
-            self._printer.feed(1)
-            self._printer.justify('L')
-
-        content = self.prepare_advice_for_printer(advice)
-        self._printer.println(content)
-
+    def print_receipt_footer(self):
         self._printer.feed(1)
         self._printer.justify('C')
         self._printer.doubleHeightOn()
@@ -193,6 +225,49 @@ class Baiiab:
         self._printer.println("http://bit.ly/baiiab")
         self._printer.feed(4)
 
+    def print_advice_long(self, advice, topic = None):
+        logging.info(topic)
+        logging.info(advice)
+        self._printer.resetStats()
+        self.render_advice_long(advice, topic)
+        self.record_print_stats("long")
+
+    def compile_advice_long(self, advice, topic = None):
+        """Renders a long receipt into a CompiledSegment without printing it (e.g. to spool it)."""
+        logging.info(topic)
+        logging.info(advice)
+        # Compile the static segments first; they can't be compiled
+        # while the receipt itself is being recorded
+        self._receipts.get('header', self.print_receipt_header)
+        self._receipts.get('footer', self.print_receipt_footer)
+        self._printer.beginProgram()
+        try:
+            self.render_advice_long(advice, topic)
+        finally:
+            segment = CompiledSegment(*self._printer.endProgram())
+        return segment
+
+    def print_compiled(self, segment, receipt = "long"):
+        self._printer.resetStats()
+        self._printer.printProgram(segment.data, segment.delay, segment.state)
+        self.record_print_stats(receipt)
+
+    def render_advice_long(self, advice, topic = None):
+        self._receipts.play('header', self.print_receipt_header)
+
+        if topic:
+            self._printer.justify('C')
+            self._printer.doubleHeightOn()
+            self._printer.println("Your " + topic)
+            self._printer.doubleHeightOff()
+            self._printer.feed(1)
+            self._printer.justify('L')
+
+        content = self.prepare_advice_for_printer(advice)
+        self._printer.println(content)
+
+        self._receipts.play('footer', self.print_receipt_footer)
+
 
     @retry(stop=(stop_after_delay(10) | stop_after_attempt(5)),
            wait=wait_random(min=1, max=2))
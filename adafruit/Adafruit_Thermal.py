@@ -26,17 +26,127 @@
 # lot of cool graphical stuff!
 #
 # TO DO:
-# - Might use standard ConfigParser library to put thermal calibration
-#   settings in a global configuration file (rather than in the library).
 # - Make this use proper Python library installation procedure.
 # - Trap errors properly.  Some stuff just falls through right now.
 # - Add docstrings throughout!
 
 from serial import Serial
+import configparser
+import logging
 import time
 import sys
 import math
 
+_INVERT = bytes(255 - i for i in range(256))
+
+# Converts a 1-bit PIL image to the packed bitmap layout printBitmap()
+# expects: MSB-first, 1 = black, each row padded to a whole byte, width
+# clipped to 384 pixels.  Returns (width, height, bitmap).
+#
+# Mode '1' images already store their pixels packed this way (with the
+# opposite polarity), so tobytes() does the packing in C and only the
+# inversion and the masking of each row's padding bits are done here,
+# a byte or a row at a time rather than per pixel.  Falls back to the
+# per-pixel loop for Imaging Library versions without tobytes().
+def imageToBitmap(image):
+	if image.mode != '1':
+		image = image.convert('1')
+	if not hasattr(image, 'tobytes'):
+		return imageToBitmapSlow(image)
+
+	width  = image.size[0]
+	height = image.size[1]
+	if width > 384:
+		width = 384
+		image = image.crop((0, 0, width, height))
+	rowBytes = math.floor((width + 7) / 8)
+	bitmap   = bytearray(image.tobytes().translate(_INVERT))
+
+	# Padding bits are 0 (black) in the image data, so after
+	# inversion they must be cleared from the last byte of each row.
+	if width & 7:
+		mask = (0xFF << (8 - (width & 7))) & 0xFF
+		bitmap[rowBytes - 1::rowBytes] = bytes(
+		  b & mask for b in bitmap[rowBytes - 1::rowBytes])
+
+	return width, height, bitmap
+
+# Reference per-pixel implementation of imageToBitmap().
+def imageToBitmapSlow(image):
+	if image.mode != '1':
+		image = image.convert('1')
+
+	width  = image.size[0]
+	height = image.size[1]
+	if width > 384:
+		width = 384
+	rowBytes = math.floor((width + 7) / 8)
+	bitmap   = bytearray(rowBytes * height)
+	pixels   = image.load()
+
+	for y in range(height):
+		n = y * rowBytes
+		x = 0
+		for b in range(rowBytes):
+			sum = 0
+			bit = 128
+			while bit > 0:
+				if x >= width: break
+				if pixels[x, y] == 0:
+					sum |= bit
+				x    += 1
+				bit >>= 1
+			bitmap[n + b] = sum
+
+	return width, height, bitmap
+
+logger = logging.getLogger(__name__)
+
+# Lookup tables for halving a bitmap horizontally.  A byte is 'doubled'
+# when its pixels come in identical pairs (bits 7/6, 5/4, 3/2, 1/0); it
+# then halves to the nibble of bits 7, 5, 3 and 1.
+_UNDOUBLED = bytes(((b >> 1) ^ b) & 0x55 != 0 for b in range(256))
+_HALVED    = bytes(((b >> 4) & 8) | ((b >> 3) & 4) | ((b >> 2) & 2) |
+  ((b >> 1) & 1) for b in range(256))
+
+# Finds the smallest equivalent of a bitmap for the raster bit image
+# command's scale modes: if every pair of rows is identical it can be
+# sent at half height and printed double height, and if every pixel is
+# doubled horizontally it can be sent at half width and printed double
+# width.  Returns (mode, w, h, bitmap) with mode as for printRaster()
+# (0 if the bitmap can't be reduced).  Double width prints whole bytes
+# of data as 16 dots, so it's only used when the row is an even number
+# of bytes; otherwise the image would print 8 dots wider than sent as a
+# bit image, and be placed off by 4 when centered.
+def scaleDownBitmap(w, h, bitmap):
+	rowBytes = (w + 7) // 8
+	data     = bytes(bitmap[:rowBytes * h])
+	mode     = 0
+
+	if h % 2 == 0 and h > 0:
+		rows = [data[y * rowBytes:(y + 1) * rowBytes] for y in range(h)]
+		if rows[0::2] == rows[1::2]:
+			data = b''.join(rows[0::2])
+			h    = h // 2
+			mode |= 2
+
+	if rowBytes % 2 == 0 and w % 2 == 0 and w > 0 and \
+	  1 not in data.translate(_UNDOUBLED):
+		halved   = data.translate(_HALVED)
+		newBytes = (w // 2 + 7) // 8
+		out      = bytearray(newBytes * h)
+		for y in range(h):
+			row = halved[y * rowBytes:(y + 1) * rowBytes]
+			for x in range(newBytes):
+				hi = row[2 * x]
+				lo = row[2 * x + 1] if 2 * x + 1 < rowBytes else 0
+				out[y * newBytes + x] = (hi << 4) | lo
+		data = bytes(out)
+		w    = w // 2
+		mode |= 1
+
+	return mode, w, h, data
+
 class Adafruit_Thermal(Serial):
 
 	resumeTime      =   0.0
@@ -53,14 +163,41 @@ class Adafruit_Thermal(Serial):
 	defaultHeatTime =   120
 	firmwareVersion =   268
 	writeToStdout   = False
+	spool           =  None
+	spoolOwned      = False
+	buffering       = False
+	bufferTime      =   0.0
+	capturing       = False
+	spinTime        =   0.0
+	waitTime        =   0.0
+	writeTime       =   0.0
+	flowControl     =  None
+	statusThreshold =  0.02
+	statusGrace     =   0.5
+	bytesSent       =     0
+	bytesSaved      =     0
+	statusRoundTrips =    0
+	paperStatus     =  True
+
+	SPOOL_BUFFER_SIZE = 65536
 
 	def __init__(self, *args, **kwargs):
 		# NEW BEHAVIOR: if no parameters given, output is written
 		# to stdout, to be piped through 'lp -o raw' (old behavior
-		# was to use default port & baud rate).
+		# was to use default port & baud rate).  Pass 'spool=X',
+		# a file name or binary file object, to write it there
+		# instead.  Either way no throttling is done.
 		baudrate = 19200
-		if len(args) == 0:
+		spool    = kwargs.pop('spool', None)
+		if len(args) == 0 or spool is not None:
 			self.writeToStdout = True
+			if spool is None:
+				self.spool = getattr(sys.stdout, 'buffer', sys.stdout)
+			elif isinstance(spool, str):
+				self.spool      = open(spool, 'wb', self.SPOOL_BUFFER_SIZE)
+				self.spoolOwned = True
+			else:
+				self.spool = spool
 		if len(args) == 1:
 			# If only port is passed, use default baud rate.
 			args = [ args[0], baudrate ]
@@ -74,6 +211,31 @@ class Adafruit_Thermal(Serial):
 		# pass "firmware=264" for version 2.64.
 		self.firmwareVersion = kwargs.get('firmware', 268)
 
+		# Pass 'buffered=True' to queue output in memory and send
+		# it to the printer in large blocks (see bufferOn()).
+		buffered    = kwargs.pop('buffered', False)
+		self.buffer = bytearray()
+
+		# Last value sent for each mode setting (see writeMode())
+		self.modes  = {}
+
+		# timeoutWait() sleeps rather than spinning.  Pass
+		# 'spintime=X' to busy-wait for the final X seconds of each
+		# wait when sleep() wakeup latency is too coarse.
+		self.spinTime = kwargs.pop('spintime', 0.0)
+
+		# Raster bit images (GS v 0, see printRaster()) are
+		# supported by 2.68 firmware.  Override with 'raster=X'.
+		self.rasterSupported = kwargs.pop('raster',
+		  self.firmwareVersion >= 268)
+
+		# Flow control (see timeoutWait()): 'status' polls the
+		# printer's status to learn when it's done, 'hardware' uses
+		# the printer's DTR (busy) line wired to the Pi's CTS pin.
+		flowControl = kwargs.pop('flowcontrol', None)
+		if flowControl not in (None, 'status', 'hardware'):
+			raise ValueError('flowcontrol must be status or hardware')
+
 		if self.writeToStdout is False:
 			# Calculate time to issue one byte to the printer.
 			# 11 bits (not 8) to accommodate idle, start and
@@ -135,9 +297,20 @@ class Adafruit_Thermal(Serial):
 			  (printBreakTime << 5) | printDensity)
 			self.dotPrintTime = 0.03
 			self.dotFeedTime  = 0.0021
+
+			if flowControl == 'hardware':
+				# Enable the printer's DTR busy signal (as the
+				# Arduino library does) and let the serial driver
+				# hold off transmission while it's raised.
+				self.writeBytes(29, 97, (1 << 5))
+				self.rtscts = True
+			self.flowControl = flowControl
 		else:
 			self.reset() # Inits some vars
 
+		if buffered:
+			self.bufferOn()
+
 	# Because there's no flow control between the printer and computer,
 	# special care must be taken to avoid overrunning the printer's
 	# buffer.  Serial output is throttled based on serial speed as well
@@ -149,15 +322,197 @@ class Adafruit_Thermal(Serial):
 	# in that it allows the calling code to continue with other duties
 	# (e.g. receiving or decoding an image) while the printer
 	# physically completes the task.
-
-	# Sets estimated completion time for a just-issued task.
+	#
+	# Times are taken from time.monotonic() so that wall clock
+	# adjustments (NTP syncing after boot is common on the Pi) can't
+	# stall or skip the throttle.
+
+	# Sets estimated completion time for a just-issued task.  While
+	# buffering, the estimate is added to the time for the pending
+	# block instead; it takes effect when the block is flushed.
 	def timeoutSet(self, x):
-		self.resumeTime = time.time() + x
-
-	# Waits (if necessary) for the prior task to complete.
+		if self.buffering:
+			self.bufferTime += x
+		else:
+			self.resumeTime = time.monotonic() + x
+
+	# Waits (if necessary) for the prior task to complete.  Nothing
+	# is transmitted while buffering, so there is nothing to wait for.
+	# The thread sleeps for the bulk of the interval so other threads
+	# (encoder, LCD, telemetry export) keep running; only the last
+	# spinTime seconds, if any, are busy-waited.
+	#
+	# The estimate is only needed for lack of flow control.  With
+	# hardware flow control the serial driver does the waiting.  With
+	# status flow control, a wait longer than statusThreshold is
+	# replaced by a status query, which the printer answers once it
+	# has finished everything sent before it, so output resumes as
+	# soon as the printer is actually done.  If the printer doesn't
+	# answer within statusGrace of the estimate, status isn't
+	# available (RX not connected?) and the estimate model is used
+	# from then on.
 	def timeoutWait(self):
-		if self.writeToStdout is False:
-			while (time.time() - self.resumeTime) < 0: pass
+		if self.writeToStdout or self.buffering:
+			return
+		if self.flowControl == 'hardware':
+			return
+		start = time.monotonic()
+		remaining = self.resumeTime - start
+		if remaining <= 0:
+			return
+		if (self.flowControl == 'status' and
+		    remaining > self.statusThreshold and
+		    self.waitStatus(remaining)):
+			self.resumeTime = time.monotonic()
+		else:
+			# A status query that went unanswered has already
+			# waited out the estimate
+			remaining = self.resumeTime - time.monotonic()
+			if remaining > self.spinTime:
+				time.sleep(remaining - self.spinTime)
+			while time.monotonic() < self.resumeTime: pass
+		self.waitTime += time.monotonic() - start
+
+	# Sends a status query and waits up to 'estimate' plus statusGrace
+	# seconds for the reply.  Returns True if the printer answered.
+	def waitStatus(self, estimate):
+		readTimeout = self.timeout
+		try:
+			self.reset_input_buffer() # Discard stale replies
+			super(Adafruit_Thermal, self).write(self.statusQuery())
+			self.bytesSent += 3
+			self.timeout = estimate + self.statusGrace
+			reply = self.read(1)
+		finally:
+			self.timeout = readTimeout
+		if not reply:
+			self.flowControl = None
+			return False
+		self.statusRoundTrips += 1
+		return True
+
+	# Per-job throttle accounting since the last resetStats(): time
+	# spent waiting (blocked) in timeoutWait() versus time spent in
+	# serial writes, bytes sent and status query round trips.
+	def resetStats(self):
+		self.waitTime         = 0.0
+		self.writeTime        = 0.0
+		self.bytesSent        = 0
+		self.bytesSaved       = 0
+		self.statusRoundTrips = 0
+
+	def getStats(self):
+		return {
+		  'wait_time'          : self.waitTime,
+		  'write_time'         : self.writeTime,
+		  'bytes_sent'         : self.bytesSent,
+		  'bytes_saved'        : self.bytesSaved,
+		  'status_round_trips' : self.statusRoundTrips }
+
+	# Buffered output.  Issuing one serial write (and one throttle
+	# check) per byte makes Python call overhead the bottleneck on
+	# slow hosts like the Pi Zero.  In buffered mode, commands and text
+	# are instead accumulated in a bytearray along with the estimated
+	# time the printer needs to process them, and sent as a single
+	# write at the end of each printing operation (line of text, feed,
+	# bitmap chunk).  The throttle delay for the whole block is applied
+	# once after it is written, using the same byteTime / dotPrintTime
+	# / dotFeedTime model as unbuffered output.
+	def bufferOn(self):
+		self.buffering = True
+
+	def bufferOff(self):
+		self.flushBuffer()
+		self.buffering = False
+
+	# Sends any pending buffered output to the printer.
+	def flushBuffer(self):
+		if not self.buffering or self.capturing or not self.buffer:
+			return
+		data  = bytes(self.buffer)
+		delay = self.bufferTime
+		self.buffer     = bytearray()
+		self.bufferTime = 0.0
+		self.buffering  = False
+		self.writeRaw(data)
+		self.timeoutSet(delay)
+		self.buffering  = True
+
+	# Compiled programs.  Between beginProgram() and endProgram(),
+	# output is recorded rather than sent to the printer.  endProgram()
+	# returns the recorded bytes, the estimated time for the printer
+	# to process them and the library's printer state afterwards, so a
+	# fixed sequence of commands (a receipt header, say) can be encoded
+	# once and replayed later with printProgram() as a single write.
+	# A program is recorded with no mode settings assumed, so it has
+	# the same effect whatever state the printer is in when it plays.
+	STATE_VARS = ('prevByte', 'column', 'maxColumn', 'charHeight',
+	  'lineSpacing', 'barcodeHeight', 'printMode', 'modes')
+
+	def getState(self):
+		state = dict((k, getattr(self, k)) for k in self.STATE_VARS)
+		state['modes'] = dict(self.modes)
+		return state
+
+	def setState(self, state):
+		for k in self.STATE_VARS:
+			setattr(self, k, state[k])
+		self.modes = dict(self.modes)
+
+	def beginProgram(self):
+		self.flushBuffer()
+		self.programBuffering = self.buffering
+		self.programModes     = self.modes
+		self.buffering  = True
+		self.capturing  = True
+		self.buffer     = bytearray()
+		self.bufferTime = 0.0
+		self.modes      = {}
+
+	def endProgram(self):
+		data  = bytes(self.buffer)
+		delay = self.bufferTime
+		state = self.getState()
+		self.buffer     = bytearray()
+		self.bufferTime = 0.0
+		self.capturing  = False
+		self.buffering  = self.programBuffering
+		self.modes      = self.programModes
+		return data, delay, state
+
+	def printProgram(self, data, delay, state):
+		self.writeRaw(data)
+		self.timeoutSet(delay)
+		self.setState(state)
+		self.flushBuffer()
+
+	# Issues a block of bytes with no throttle bookkeeping of its own;
+	# callers are responsible for timeoutSet().  Queued if buffering.
+	def writeRaw(self, data):
+		if self.buffering:
+			self.buffer += data
+		elif self.writeToStdout:
+			self.spool.write(data)
+			self.bytesSent += len(data)
+		else:
+			self.timeoutWait()
+			start = time.monotonic()
+			super(Adafruit_Thermal, self).write(data)
+			self.writeTime += time.monotonic() - start
+			self.bytesSent += len(data)
+
+	# Sends anything still buffered, then closes the serial port (or
+	# the spool file, if it was opened here; other spools are just
+	# flushed).
+	def close(self):
+		self.flushBuffer()
+		if self.writeToStdout:
+			if self.spoolOwned:
+				self.spool.close()
+			else:
+				self.spool.flush()
+		else:
+			super(Adafruit_Thermal, self).close()
 
 	# Printer performance may vary based on the power supply voltage,
 	# thickness of paper, phase of the moon and other seemingly random
@@ -176,50 +531,101 @@ class Adafruit_Thermal(Serial):
 		self.dotPrintTime = p / 1000000.0
 		self.dotFeedTime  = f / 1000000.0
 
+	# Print and feed times can be measured per unit with calibrate()
+	# and kept in a configuration file, so each printer runs as fast as
+	# it safely can rather than at the library's conservative defaults.
+	# Times in the file are in microseconds, as for setTimes().
+	def saveTimes(self, path):
+		config = configparser.ConfigParser()
+		config['printer'] = {
+		  'print_time' : '%.1f' % (self.dotPrintTime * 1000000.0),
+		  'feed_time'  : '%.1f' % (self.dotFeedTime  * 1000000.0) }
+		with open(path, 'w') as f:
+			config.write(f)
+
+	# Returns True if times were loaded, False if the file is missing.
+	def loadTimes(self, path):
+		config = configparser.ConfigParser()
+		if not config.read(path):
+			return False
+		self.setTimes(
+		  config.getfloat('printer', 'print_time'),
+		  config.getfloat('printer', 'feed_time'))
+		return True
+
 	# 'Raw' byte-writing method
-	def writeBytes(self, *args):
-		if self.writeToStdout:
-			for arg in args:
-				sys.stdout.write(bytes([arg]))
-		else:
-			for arg in args:
-				self.timeoutWait()
-				self.timeoutSet(len(args) * self.byteTime)
-				super(Adafruit_Thermal, self).write(bytes([arg]))
+	# Mode settings (justification, size, print mode, line height,
+	# charset, etc.) are only sent when they change: the last value
+	# sent for each is recorded in 'modes' by name, and a command
+	# repeating it is skipped.  reset() and wake() forget them all,
+	# since the printer may no longer be in the state they describe.
+	# Returns True if the command was sent.
+	def writeMode(self, name, *args):
+		if self.modes.get(name) == args[-1]:
+			return False
+		self.modes[name] = args[-1]
+		self.writeBytes(*args)
+		return True
+
+	def forgetModes(self):
+		self.modes = {}
 
-	# Override write() method to keep track of paper feed.
+	def writeBytes(self, *args):
+		self.writeRaw(bytes(args))
+		self.timeoutSet(len(args) * self.byteTime)
+
+	# Override write() method to keep track of paper feed.  Each
+	# argument is a block of text (bytes, str or a single byte value).
+	# Rather than stepping through it a byte at a time, the block is
+	# split at newlines and the line wraps in each piece are counted
+	# from its length, so the print and feed time for the whole block
+	# is found in one pass.  Each piece goes out as a single write
+	# with the time for the lines it prints.
 	def write(self, *data):
-		for i in range(len(data)):
-			c = data[i]
-			if self.writeToStdout:
-				sys.stdout.write(c)
+		for c in data:
+			if isinstance(c, str):
+				c = c.encode('cp437', 'ignore')
+			elif isinstance(c, int):
+				c = bytes((c,))
+			c = bytes(c).replace(b'\x13', b'')
+			if not c:
 				continue
-			if c != 0x13:
-				self.timeoutWait()
-				super(Adafruit_Thermal, self).write(c)
-				d = self.byteTime
-				if ((c == '\n') or
-				    (self.column == self.maxColumn)):
-					# Newline or wrap
-					if self.prevByte == '\n':
-						# Feed line (blank)
-						d += ((self.charHeight +
-						       self.lineSpacing) *
-						      self.dotFeedTime)
-					else:
-						# Text line
-						d += ((self.charHeight *
-						       self.dotPrintTime) +
-						      (self.lineSpacing *
-						       self.dotFeedTime))
-						self.column = 0
-						# Treat wrap as newline
-						# on next pass
-						c = '\n'
-				else:
-					self.column += 1
-				self.timeoutSet(d)
-				self.prevByte = c
+			lines = c.split(b'\n')
+			last  = len(lines) - 1
+			for i in range(len(lines)):
+				text = lines[i]
+				if i < last:
+					text += b'\n'
+				elif not text:
+					break
+				self.writeRaw(text)
+				self.timeoutSet(len(text) * self.byteTime +
+				  self.textTime(lines[i], i < last))
+
+	# Time to print a line of text (without its newline) from the
+	# current column, plus the newline ending it if 'newline'.  A
+	# character arriving with the line already full wraps it.
+	def textTime(self, text, newline):
+		d = 0.0
+		if text:
+			end   = self.column + len(text)
+			wraps = (end - 1) // self.maxColumn
+			self.column   = end - wraps * self.maxColumn
+			self.prevByte = chr(text[-1])
+			d += wraps * ((self.charHeight * self.dotPrintTime) +
+			  (self.lineSpacing * self.dotFeedTime))
+		if newline:
+			if self.prevByte == '\n':
+				# Feed line (blank)
+				d += ((self.charHeight + self.lineSpacing) *
+				  self.dotFeedTime)
+			else:
+				# Text line
+				d += ((self.charHeight * self.dotPrintTime) +
+				  (self.lineSpacing * self.dotFeedTime))
+			self.column   = 0
+			self.prevByte = '\n'
+		return d
 
 	# The bulk of this method was moved into __init__,
 	# but this is left here for compatibility with older
@@ -234,6 +640,7 @@ class Adafruit_Thermal(Serial):
 
 	def reset(self):
 		self.writeBytes(27, 64) # Esc @ = init command
+		self.forgetModes()
 		self.prevByte      = '\n' # Treat as if prior line is blank
 		self.column        =  0
 		self.maxColumn     = 32
@@ -269,11 +676,12 @@ class Adafruit_Thermal(Serial):
 		self.timeoutSet(
 		  self.dotPrintTime * 24 * 26 +
 		  self.dotFeedTime * (6 * 26 + 30))
+		self.flushBuffer()
 
 	def setBarcodeHeight(self, val=50):
 		if val < 1: val = 1
 		self.barcodeHeight = val
-		self.writeBytes(29, 104, val)
+		self.writeMode('barcodeHeight', 29, 104, val)
 
 	UPC_A   =  0
 	UPC_E   =  1
@@ -339,22 +747,13 @@ class Adafruit_Thermal(Serial):
 			# Recent firmware: write length byte + string sans NUL
 			n = len(text)
 			if n > 255: n = 255
-			if self.writeToStdout:
-				sys.stdout.write((chr(n)).encode('cp437', 'ignore'))
-				for i in range(n):
-					sys.stdout.write(text[i].encode('utf-8', 'ignore'))
-			else:
-				super(Adafruit_Thermal, self).write((chr(n)).encode('utf-8', 'ignore'))
-				for i in range(n):
-					super(Adafruit_Thermal,
-					  self).write(text[i].encode('utf-8', 'ignore'))
+			self.writeRaw(bytes((n,)) +
+			  text[:n].encode('utf-8', 'ignore'))
 		else:
 			# Older firmware: write string + NUL
-			if self.writeToStdout:
-				sys.stdout.write(text.encode('utf-8', 'ignore'))
-			else:
-				super(Adafruit_Thermal, self).write(text.encode('utf-8', 'ignore'))
+			self.writeRaw(text.encode('utf-8', 'ignore'))
 		self.prevByte = '\n'
+		self.flushBuffer()
 
 	# === Character commands ===
 
@@ -389,8 +788,12 @@ class Adafruit_Thermal(Serial):
 		else:
 			self.maxColumn  = 32
 
+	# ESC ! and GS ! both set the character size (the print mode's
+	# double height and width bits), so sending either one means the
+	# printer may no longer be in the state recorded for the other.
 	def writePrintMode(self):
-		self.writeBytes(27, 33, self.printMode)
+		if self.writeMode('printMode', 27, 33, self.printMode):
+			self.modes.pop('size', None)
 
 	def normal(self):
 		self.printMode = 0
@@ -398,13 +801,13 @@ class Adafruit_Thermal(Serial):
 
 	def inverseOn(self):
 		if self.firmwareVersion >= 268:
-			self.writeBytes(29, 66, 1)
+			self.writeMode('inverse', 29, 66, 1)
 		else:
 			self.setPrintMode(self.INVERSE_MASK)
 
 	def inverseOff(self):
 		if self.firmwareVersion >= 268:
-			self.writeBytes(29, 66, 0)
+			self.writeMode('inverse', 29, 66, 0)
 		else:
 			self.unsetPrintMode(self.INVERSE_MASK)
 
@@ -446,7 +849,7 @@ class Adafruit_Thermal(Serial):
 			pos = 2
 		else:
 			pos = 0
-		self.writeBytes(0x1B, 0x61, pos)
+		self.writeMode('justify', 0x1B, 0x61, pos)
 
 	# Feeds by the specified number of lines
 	def feed(self, x=1):
@@ -462,6 +865,7 @@ class Adafruit_Thermal(Serial):
 			while x > 0:
 				self.write('\n'.encode('cp437', 'ignore'))
 				x -= 1
+		self.flushBuffer()
 
 	# Feeds by the specified number of individual pixel rows
 	def feedRows(self, rows):
@@ -469,6 +873,7 @@ class Adafruit_Thermal(Serial):
 		self.timeoutSet(rows * self.dotFeedTime)
 		self.prevByte = '\n'
 		self.column = 0
+		self.flushBuffer()
 
 	def flush(self):
 		self.writeBytes(12) # ASCII FF
@@ -493,7 +898,8 @@ class Adafruit_Thermal(Serial):
 			self.charHeight = 24
 			self.maxColumn  = 32
 
-		self.writeBytes(29, 33, size)
+		if self.writeMode('size', 29, 33, size):
+			self.modes.pop('printMode', None)
 		prevByte = '\n' # Setting the size adds a linefeed
 
 	# Underlines of different weights can be produced:
@@ -502,12 +908,133 @@ class Adafruit_Thermal(Serial):
 	# 2 - thick underline
 	def underlineOn(self, weight=1):
 		if weight > 2: weight = 2
-		self.writeBytes(27, 45, weight)
+		self.writeMode('underline', 27, 45, weight)
 
 	def underlineOff(self):
-		self.writeBytes(27, 45, 0)
+		self.writeMode('underline', 27, 45, 0)
+
+	# Prints a bitmap, sending only the rows with ink in them: runs of
+	# blank rows become paper feeds and blank byte columns at the
+	# edges are trimmed off.  'justify' is how the printer is placing
+	# the bitmap (as set with justify()) and decides which margins can
+	# go without moving the image: the right one when left justified,
+	# the left one when right justified, and equal amounts of both
+	# when centered.  Pass trim=False to send the bitmap as is.
+	def printBitmap(self, w, h, bitmap, LaaT=False, justify='L',
+	  trim=True):
+		if LaaT or not trim:
+			self.printBitmapRows(w, h, bitmap, LaaT)
+			return
+
+		sent     = self.bytesSent + len(self.buffer)
+		width    = w
+		rowBytes = (w + 7) // 8
+		rows     = [bytes(bitmap[y * rowBytes:(y + 1) * rowBytes])
+		  for y in range(h)]
+		blank    = bytes(rowBytes)
+
+		# Trim blank byte columns at the edges
+		ink = 0
+		for row in rows:
+			ink |= int.from_bytes(row, 'big')
+		ink  = ink.to_bytes(rowBytes, 'big')
+		left = len(ink) - len(ink.lstrip(b'\0'))
+		right = len(ink) - len(ink.rstrip(b'\0'))
+		c = justify.upper()
+		if   c == 'C': left = right = min(left, right)
+		elif c == 'R': right = 0
+		else:          left  = 0
+		if 0 < left + right < rowBytes:
+			rows  = [row[left:rowBytes - right] for row in rows]
+			w     = min(w - left * 8, (rowBytes - left - right) * 8)
+			blank = bytes(rowBytes - left - right)
+
+		# Split into runs of inked and blank rows.  A blank run is fed
+		# rather than sent when that's shorter: 3 bytes per feed
+		# command, plus the header of the bitmap chunk that follows
+		# when the run is between inked rows.
+		runs = []
+		for y in range(h):
+			isBlank = rows[y] == blank
+			if runs and runs[-1][0] == isBlank:
+				runs[-1][2] = y + 1
+			else:
+				runs.append([isBlank, y, y + 1])
+		feeds = 0
+		start = None
+		for isBlank, y0, y1 in runs:
+			n = y1 - y0
+			header = 0 if start is None or y1 == h else 8
+			if isBlank and (n * len(blank) >
+			  3 * ((n + 254) // 255) + header):
+				if start is not None:
+					self.printBitmapRows(w, y0 - start,
+					  b''.join(rows[start:y0]), LaaT)
+					start = None
+				while n > 0:
+					self.feedRows(min(n, 255))
+					n -= 255
+				feeds += y1 - y0
+			elif start is None:
+				start = y0
+		if start is not None:
+			self.printBitmapRows(w, h - start, b''.join(rows[start:]),
+			  LaaT)
+
+		saved = self.bitmapBytes(width, h) - (
+		  self.bytesSent + len(self.buffer) - sent)
+		self.bytesSaved += saved
+		logger.debug('printBitmap %dx%d: %d bytes saved (%d blank rows '
+		  'fed, %d+%d margin bytes per row trimmed)',
+		  width, h, saved, feeds, left, right)
+
+	# Prints bitmap rows with whichever command needs the fewest bytes:
+	# the DC2 * bit image command, or (if the firmware supports it and
+	# the bitmap is pixel-doubled) the raster bit image command with a
+	# scale mode, sending half or a quarter of the data.  Both print
+	# the same number of dot rows, so bytes over the serial link are
+	# what decides wall time.
+	def printBitmapRows(self, w, h, bitmap, LaaT=False):
+		if not LaaT and self.rasterSupported and w <= 384:
+			mode, sw, sh, scaled = scaleDownBitmap(w, h, bitmap)
+			if mode and (self.rasterBytes(sw, sh) <
+			             self.bitmapBytes(w, h, LaaT)):
+				self.printRaster(sw, sh, scaled, mode)
+				return
+		self.printBitImage(w, h, bitmap, LaaT)
+
+	# Bytes needed to send a bitmap with printBitImage() / printRaster()
+	def bitmapBytes(self, w, h, LaaT=False):
+		rowBytes = min((w + 7) // 8, 48)
+		chunk    = 1 if LaaT else 255
+		return rowBytes * h + 4 * ((h + chunk - 1) // chunk)
+
+	def rasterBytes(self, w, h):
+		return (w + 7) // 8 * h + 8 * ((h + 254) // 255)
+
+	# Raster bit image: GS v 0 m xL xH yL yH d1...dk.  Mode m scales
+	# the image as it prints: 1 = double width, 2 = double height,
+	# 3 = both, so w and h here are the dimensions of the data sent.
+	def printRaster(self, w, h, bitmap, mode=0):
+		rowBytes = (w + 7) // 8
+		scaleY   = 2 if mode & 2 else 1
+		i = 0
+		for rowStart in range(0, h, 255):
+			chunkHeight = min(h - rowStart, 255)
+			chunk = bytearray((29, 118, 48, mode,
+			  rowBytes & 0xFF, rowBytes >> 8,
+			  chunkHeight & 0xFF, chunkHeight >> 8))
+			chunk += bytes(bitmap[i:i + chunkHeight * rowBytes])
+			i += chunkHeight * rowBytes
+			self.writeRaw(bytes(chunk))
+			self.timeoutSet(len(chunk) * self.byteTime +
+			  chunkHeight * scaleY * self.dotPrintTime)
+			self.flushBuffer()
+
+		self.prevByte = '\n'
 
-	def printBitmap(self, w, h, bitmap, LaaT=False):
+	# Bit image: DC2 * r n d1...dk, in chunks of up to 255 rows
+	def printBitImage(self, w, h, bitmap, LaaT=False):
 		rowBytes = math.floor((w + 7) / 8)  # Round up to next byte boundary
 		if rowBytes >= 48:
 			rowBytesClipped = 48  # 384 pixels max width
@@ -529,19 +1056,20 @@ class Adafruit_Thermal(Serial):
 			if chunkHeight > maxChunkHeight:
 				chunkHeight = maxChunkHeight
 
-			# Timeout wait happens here
-			self.writeBytes(18, 42, chunkHeight, rowBytesClipped)
-
-			for y in range(chunkHeight):
-				for x in range(rowBytesClipped):
-					if self.writeToStdout:
-						sys.stdout.write(bytes([bitmap[i]]))
-					else:
-						super(Adafruit_Thermal,
-						  self).write(bytes([bitmap[i]]))
-					i += 1
-				i += rowBytes - rowBytesClipped
-			self.timeoutSet(chunkHeight * self.dotPrintTime)
+			# Command and chunk data go out as a single block;
+			# timeout wait happens here
+			chunk = bytearray((18, 42, chunkHeight, rowBytesClipped))
+			if rowBytes == rowBytesClipped:
+				chunk += bytes(bitmap[i:i + chunkHeight * rowBytes])
+				i += chunkHeight * rowBytes
+			else:
+				for y in range(chunkHeight):
+					chunk += bytes(bitmap[i:i + rowBytesClipped])
+					i += rowBytes
+			self.writeRaw(bytes(chunk))
+			self.timeoutSet(4 * self.byteTime +
+			  chunkHeight * self.dotPrintTime)
+			self.flushBuffer()
 
 		self.prevByte = '\n'
 
@@ -559,38 +1087,17 @@ class Adafruit_Thermal(Serial):
 		if image.mode != '1':
 			image = image.convert('1')
 
-		width  = image.size[0]
-		height = image.size[1]
-		if width > 384:
-			width = 384
-		rowBytes = math.floor((width + 7) / 8)
-		bitmap   = bytearray(rowBytes * height)
-		pixels   = image.load()
-
-		for y in range(height):
-			n = y * rowBytes
-			x = 0
-			for b in range(rowBytes):
-				sum = 0
-				bit = 128
-				while bit > 0:
-					if x >= width: break
-					if pixels[x, y] == 0:
-						sum |= bit
-					x    += 1
-					bit >>= 1
-				bitmap[n + b] = sum
-
+		width, height, bitmap = imageToBitmap(image)
 		self.printBitmap(width, height, bitmap, LaaT)
 
 	# Take the printer offline. Print commands sent after this
 	# will be ignored until 'online' is called.
 	def offline(self):
-		self.writeBytes(27, 61, 0)
+		self.writeMode('online', 27, 61, 0)
 
 	# Take the printer online. Subsequent print commands will be obeyed.
 	def online(self):
-		self.writeBytes(27, 61, 1)
+		self.writeMode('online', 27, 61, 1)
 
 	# Put the printer into a low-energy state immediately.
 	def sleep(self):
@@ -605,8 +1112,10 @@ class Adafruit_Thermal(Serial):
 			self.writeBytes(27, 56, seconds)
 
 	def wake(self):
+		self.forgetModes()
 		self.timeoutSet(0)
 		self.writeBytes(255)
+		self.flushBuffer() # Wake byte must go out before the delay
 		if self.firmwareVersion >= 264:
 			time.sleep(0.05)            # 50 ms
 			self.writeBytes(27, 118, 0) # Sleep off (important!)
@@ -622,17 +1131,101 @@ class Adafruit_Thermal(Serial):
 
 	# Check the status of the paper using the printers self reporting
 	# ability. Doesn't match the datasheet...
-	# Returns True for paper, False for no paper.
+	# Returns True for paper, False for no paper, or None if the
+	# printer can't say: it didn't answer (TX not connected?) or output
+	# isn't going to a printer.  The printer answers once it has dealt
+	# with everything sent before the query.  Once a query has gone
+	# unanswered, paperStatus is cleared and later calls return None
+	# right away rather than wait out the read timeout again.  (This is
+	# separate from status flow control, which falls back on its own.)
 	def hasPaper(self):
-		if self.firmwareVersion >= 264:
-			self.writeBytes(27, 118, 0)
-		else:
-			self.writeBytes(29, 114, 0)
+		if self.writeToStdout or not self.paperStatus:
+			return None
+		self.flushBuffer()
+		# Discard stale replies (wake() sends the same query)
+		self.reset_input_buffer()
+		self.writeBytes(*self.statusQuery())
+		self.flushBuffer()
+		reply = self.read(1)
+		if not reply:
+			self.paperStatus = False
+			return None
 		# Bit 2 of response seems to be paper status
-		stat = ord(self.read(1)) & 0b00000100
+		stat = ord(reply) & 0b00000100
 		# If set, we have paper; if clear, no paper
 		return stat == 0
 
+	# Status query bytes, as used by hasPaper()
+	def statusQuery(self):
+		if self.firmwareVersion >= 264:
+			return bytes((27, 118, 0))
+		return bytes((29, 114, 0))
+
+	# Sends data followed by a status query in a single write, without
+	# throttling, and waits for the reply.  The printer answers status
+	# queries in order, so the reply only comes back once everything
+	# sent before it has been printed.  Returns the elapsed time in
+	# seconds, or None if the printer didn't answer (RX not connected?)
+	def timeRoundTrip(self, data=b''):
+		self.timeoutWait()
+		# Discard stale replies (wake() sends the same query)
+		self.reset_input_buffer()
+		start = time.monotonic()
+		super(Adafruit_Thermal, self).write(data + self.statusQuery())
+		reply = self.read(1)
+		if not reply:
+			return None
+		return time.monotonic() - start
+
+	# Measures this printer's actual print and feed times by printing
+	# a test pattern and timing status round trips, then applies them
+	# with setTimes().  A block of full-width text lines gives the time
+	# per printed dot row (text is cheap to send but slow to print, so
+	# serial speed doesn't skew the result) and a long paper feed gives
+	# the time per fed row; the round trip of a bare status query is
+	# subtracted from both.  The fitted times are padded by 'margin' to
+	# stay clear of buffer overruns.  Returns the new (print, feed)
+	# times in microseconds, or None if the printer can't report status.
+	def calibrate(self, lines=8, feedRows=510, margin=1.1):
+		if self.writeToStdout:
+			return None
+		buffering = self.buffering
+		self.bufferOff()
+		readTimeout  = self.timeout
+		self.timeout = 30
+		try:
+			self.setDefault()
+			self.feed(1)
+			# Wait for setup to finish printing, then time a bare query
+			if self.timeRoundTrip() is None:
+				return None
+			base = min(self.timeRoundTrip() or 0.0 for i in range(3))
+
+			line = ('#' * (self.maxColumn - 1) + '\n').encode('cp437')
+			text = self.timeRoundTrip(line * lines)
+
+			feed = bytearray()
+			rows = feedRows
+			while rows > 0:
+				feed += bytes((27, 74, min(rows, 255)))
+				rows -= 255
+			fed = self.timeRoundTrip(bytes(feed))
+			if text is None or fed is None:
+				return None
+			text -= base
+			fed  -= base
+		finally:
+			self.timeout = readTimeout
+			if buffering:
+				self.bufferOn()
+
+		f = max(fed, 0.0) / feedRows
+		p = max(text / lines - self.lineSpacing * f, 0.0) / self.charHeight
+		self.setTimes(p * margin * 1000000.0, f * margin * 1000000.0)
+		self.prevByte = '\n'
+		self.column   = 0
+		return self.dotPrintTime * 1000000.0, self.dotFeedTime * 1000000.0
+
 	def setLineHeight(self, val=32):
 		if val < 24: val = 24
 		self.lineSpacing = val - 24
@@ -641,7 +1234,7 @@ class Adafruit_Thermal(Serial):
 		# height when setting line height, making this more akin
 		# to inter-line spacing.  Default line spacing is 32
 		# (char height of 24, line spacing of 8).
-		self.writeBytes(27, 51, val)
+		self.writeMode('lineHeight', 27, 51, val)
 
 	CHARSET_USA          =  0
 	CHARSET_FRANCE       =  1
@@ -664,7 +1257,7 @@ class Adafruit_Thermal(Serial):
 	# Alters some chars in ASCII 0x23-0x7E range; see datasheet
 	def setCharset(self, val=0):
 		if val > 15: val = 15
-		self.writeBytes(27, 82, val)
+		self.writeMode('charset', 27, 82, val)
 
 	CODEPAGE_CP437       =  0 # USA, Standard Europe
 	CODEPAGE_KATAKANA    =  1
@@ -714,7 +1307,7 @@ class Adafruit_Thermal(Serial):
 	# Selects alt symbols for 'upper' ASCII values 0x80-0xFF
 	def setCodePage(self, val=0):
 		if val > 47: val = 47
-		self.writeBytes(27, 116, val)
+		self.writeMode('codePage', 27, 116, val)
 
 	# Copied from Arduino lib for parity; may not work on all printers
 	def tab(self):
@@ -731,10 +1324,12 @@ class Adafruit_Thermal(Serial):
 	def print(self, *args, **kwargs):
 		for arg in args:
 			self.write((str(arg)).encode('cp437', 'ignore'))
+		self.flushBuffer()
 
 	# For Arduino code compatibility again
 	def println(self, *args, **kwargs):
 		for arg in args:
 			self.write((str(arg)).encode('cp437', 'ignore'))
 		self.write('\n'.encode('cp437', 'ignore'))
+		self.flushBuffer()
 
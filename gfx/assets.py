@@ -0,0 +1,160 @@
+"""
+Logo asset pipeline.
+
+Logos are kept as ordinary images in gfx/ and converted on demand into packed
+printer bitmaps: MSB-first, 1 = black, each row padded to a whole byte (the
+layout Adafruit_Thermal.printBitmap() expects). Converted bitmaps are cached
+as small binary files, keyed by a hash of the source image, so the service
+only reads a few KB of bytes at startup instead of compiling a Python list
+literal with one int object per byte.
+
+Binary format: a 10 byte header (magic b'TBMP', then width, height and bytes
+per row as little-endian uint16) followed by height * row bytes of bitmap.
+
+Usage:
+    python -m gfx.assets          # convert all logos and report sizes
+"""
+
+import hashlib
+import logging
+import os
+import struct
+
+logger = logging.getLogger(__name__)
+
+GFX_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = "cache/gfx"
+
+MAGIC = b"TBMP"
+HEADER = struct.Struct("<4sHHH")
+
+# Bump when conversion changes, so cached bitmaps are rebuilt
+CONVERTER_VERSION = 1
+
+# LOGO_IMG names -> source images in gfx/
+LOGOS = {
+    "sheep": "sheep-banner.bmp",
+    "sheepsmall": "sheep-75x75.bmp",
+    "azure_monochrome": "azure-monochrome.bmp",
+}
+
+MAX_WIDTH = 384
+
+
+class Logo:
+    """A packed printer bitmap: the same width/height/data interface as the old gfx modules."""
+
+    def __init__(self, width, height, data):
+        self.width = width
+        self.height = height
+        self.data = data
+
+    @property
+    def row_bytes(self):
+        return (self.width + 7) // 8
+
+    def __repr__(self):
+        return f'Logo({self.width}x{self.height})'
+
+
+def source_path(name):
+    """Source image for a logo name, or None if there isn't one."""
+    filename = LOGOS.get(name)
+    if filename:
+        return os.path.join(GFX_DIR, filename)
+    for ext in (".bmp", ".png"):
+        path = os.path.join(GFX_DIR, name.replace("_", "-") + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def convert(path):
+    """
+    Convert an image to a Logo.
+
+    Pixels whose brightest channel is below 127 become black, matching the
+    THRESHOLD filter of adafruit/bitmapImageConvert.pde that produced the
+    original gfx modules.
+    """
+    from PIL import Image, ImageChops
+    from adafruit.Adafruit_Thermal import imageToBitmap
+
+    image = Image.open(path).convert("RGB")
+    if image.size[0] > MAX_WIDTH:
+        image = image.crop((0, 0, MAX_WIDTH, image.size[1]))
+    r, g, b = image.split()
+    brightness = ImageChops.lighter(r, ImageChops.lighter(g, b))
+    mono = brightness.point(lambda v: 255 if v >= 127 else 0, "1")
+    # Packed the same way as images printed at runtime
+    width, height, data = imageToBitmap(mono)
+    return Logo(width, height, bytes(data))
+
+
+def pack(logo):
+    return HEADER.pack(MAGIC, logo.width, logo.height, logo.row_bytes) + bytes(logo.data)
+
+
+def unpack(blob):
+    magic, width, height, row_bytes = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("Not a packed bitmap")
+    data = blob[HEADER.size:]
+    if row_bytes != (width + 7) // 8 or len(data) != row_bytes * height:
+        raise ValueError("Packed bitmap size doesn't match its header")
+    return Logo(width, height, data)
+
+
+def cache_key(path):
+    digest = hashlib.sha1(str(CONVERTER_VERSION).encode("utf-8"))
+    with open(path, "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load_logo(name, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Load a logo by name, converting its source image if it isn't cached yet.
+
+    Args:
+        name: Logo name (the LOGO_IMG setting), e.g. "sheep"
+        cache_dir: Directory for packed bitmaps, or None to always convert
+
+    Returns:
+        Logo
+    """
+    path = source_path(name)
+    if path is None:
+        raise FileNotFoundError(f"No source image for logo '{name}' in {GFX_DIR}")
+
+    cached = os.path.join(cache_dir, cache_key(path) + ".bin") if cache_dir else None
+    if cached:
+        try:
+            with open(cached, "rb") as f:
+                return unpack(f.read())
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Ignoring unreadable logo cache {cached}: {e}")
+
+    logo = convert(path)
+    logger.info(f"Converted logo '{name}' from {path}: {logo}")
+    if cached:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cached + ".tmp", "wb") as f:
+                f.write(pack(logo))
+            os.replace(cached + ".tmp", cached)
+        except OSError as e:
+            logger.warning(f"Failed to write logo cache {cached}: {e}")
+    return logo
+
+
+def main():
+    for name in sorted(LOGOS):
+        logo = load_logo(name)
+        print(f"{name:<18} {logo.width:>4}x{logo.height:<4} {len(logo.data):>6} bytes  <- {LOGOS[name]}")
+
+
+if __name__ == "__main__":
+    main()
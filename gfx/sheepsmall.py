@@ -1,79 +0,0 @@
-width  = 75
-height = 75
-data   = [
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x3C, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x07, 0xFF, 0xF0, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x3F, 0xE3, 0xFE, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0xF8, 0x00, 0x1F, 0x80, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x03, 0xC0, 0x00, 0x03, 0xE0, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x0F, 0x00, 0x00, 0x00, 0x70, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x1C, 0x00, 0x00, 0x00, 0x1C, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x30, 0x00, 0x1F, 0xE0, 0x0E, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x60, 0x00, 0x70, 0x18, 0x03, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0xC0, 0x00, 0xC0, 0x0C, 0x01, 0x80, 0x00, 0x00,
-  0x00, 0x01, 0x00, 0x7D, 0x80, 0x07, 0xE0, 0xC0, 0x00, 0x00,
-  0x00, 0x02, 0x01, 0xC7, 0x00, 0x07, 0x10, 0x60, 0x00, 0x00,
-  0x00, 0x04, 0x03, 0x00, 0x00, 0x0D, 0x08, 0x30, 0x00, 0x00,
-  0x00, 0x0C, 0x04, 0x00, 0x00, 0x0D, 0x08, 0x10, 0x00, 0x00,
-  0x00, 0x08, 0x0C, 0x00, 0x00, 0x07, 0x0C, 0x08, 0x00, 0x00,
-  0x00, 0x00, 0x08, 0x00, 0x00, 0x02, 0x08, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x1E, 0x00, 0x00, 0x00, 0x0C, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x7F, 0x00, 0x00, 0x00, 0x0F, 0x80, 0x00, 0x00,
-  0x00, 0x03, 0xE9, 0x80, 0x00, 0x00, 0x0F, 0xF0, 0x00, 0x00,
-  0x00, 0x0F, 0xCC, 0x80, 0x00, 0x00, 0x07, 0xFC, 0x00, 0x00,
-  0x00, 0x3F, 0x87, 0x80, 0x00, 0x00, 0x07, 0xFF, 0x80, 0x00,
-  0x00, 0xFF, 0x80, 0x1F, 0x00, 0x1F, 0x8F, 0xFF, 0xE0, 0x00,
-  0x03, 0xFE, 0x80, 0x7F, 0xC0, 0x7F, 0xDF, 0xFF, 0xF0, 0x00,
-  0x07, 0xF8, 0x80, 0xFF, 0xE0, 0xFF, 0xFE, 0x0F, 0xF8, 0x00,
-  0x07, 0xF0, 0x81, 0xF8, 0xE1, 0xFF, 0xF8, 0x7B, 0xFC, 0x00,
-  0x0F, 0xE0, 0x81, 0xF0, 0x71, 0xC3, 0xFF, 0xC1, 0xFC, 0x00,
-  0x0F, 0xE0, 0xC3, 0xE0, 0x31, 0x81, 0xF8, 0x3C, 0xFC, 0x00,
-  0x07, 0xC7, 0xE3, 0xC0, 0x33, 0x80, 0xF9, 0xFC, 0xFC, 0x00,
-  0x07, 0xC7, 0xF3, 0xC6, 0x1B, 0x80, 0xFB, 0xFC, 0xF8, 0x00,
-  0x07, 0xE7, 0xFB, 0xC4, 0x1B, 0x88, 0xFB, 0xFC, 0xF8, 0x00,
-  0x03, 0xE7, 0xFB, 0xC0, 0x3B, 0x80, 0xFB, 0x3D, 0xF0, 0x00,
-  0x01, 0xF7, 0x9B, 0xC0, 0x33, 0xC0, 0xFF, 0xB9, 0xF0, 0x00,
-  0x01, 0xF3, 0x39, 0xE0, 0x71, 0xE1, 0xF3, 0x83, 0xE0, 0x00,
-  0x00, 0xF8, 0x79, 0xF0, 0xF1, 0xF3, 0xF3, 0xCF, 0xC0, 0x00,
-  0x00, 0x7E, 0x79, 0xFF, 0xE0, 0xFF, 0xF3, 0xFF, 0x80, 0x00,
-  0x00, 0x3F, 0xF9, 0xFF, 0xC0, 0x7F, 0xF1, 0xFF, 0x00, 0x00,
-  0x00, 0x1F, 0xF1, 0x3F, 0x80, 0x3F, 0xA0, 0xFE, 0x00, 0x00,
-  0x00, 0x0F, 0xE1, 0x8C, 0x00, 0x04, 0x20, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x80, 0x00, 0x00, 0x20, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x80, 0x00, 0x00, 0x20, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x80, 0x00, 0x00, 0x40, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0xC0, 0x7F, 0x00, 0x40, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x41, 0xFF, 0xC0, 0x40, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x43, 0xFF, 0xE0, 0x80, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x23, 0x3F, 0xB0, 0x80, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x27, 0x0C, 0x31, 0x80, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x17, 0xDC, 0x71, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x3F, 0xF7, 0xFF, 0xFB, 0xFC, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x0F, 0xFF, 0xF2, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x0F, 0xFF, 0xF4, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x07, 0xFF, 0xFC, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x03, 0xFF, 0xF8, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x01, 0xFF, 0xE0, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x7F, 0x80, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-  0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00
-]
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark bitmap printing against the virtual printer (no hardware needed).
+Prints each logo as is and with blank rows and margins elided, then a logo
+enlarged 2x with the DC2 * bit image command and with the raster bit image
+command (GS v 0) chosen automatically by printBitmap(), and reports bytes
+sent, bytes saved and wall time for each. Status flow control is used so host
+time follows the printer rather than the default timing estimates.
+"""
+
+import os
+import sys
+import time
+
+# Add parent directory to path so we can import from project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adafruit.Adafruit_Thermal import Adafruit_Thermal
+from printing.virtual_printer import VirtualPrinter, format_job
+from gfx.assets import LOGOS, load_logo
+
+LOGO = "sheepsmall"
+
+
+def enlarge(logo):
+    """Scale a packed bitmap up 2x in both directions."""
+    width, height = logo.width * 2, logo.height * 2
+    row_bytes = (width + 7) // 8
+    data = bytearray(row_bytes * height)
+    for y in range(logo.height):
+        src = logo.data[y * logo.row_bytes:(y + 1) * logo.row_bytes]
+        row = bytearray(row_bytes)
+        for x in range(logo.width):
+            if src[x >> 3] & (0x80 >> (x & 7)):
+                for dx in (2 * x, 2 * x + 1):
+                    row[dx >> 3] |= 0x80 >> (dx & 7)
+        data[2 * y * row_bytes:(2 * y + 1) * row_bytes] = row
+        data[(2 * y + 1) * row_bytes:(2 * y + 2) * row_bytes] = row
+    return width, height, bytes(data)
+
+
+def run(label, width, height, bitmap, trim=True, **driver_kwargs):
+    with VirtualPrinter(job_timeout=None) as vprinter:
+        printer = Adafruit_Thermal(vprinter.port, 19200, timeout=5, **driver_kwargs)
+        vprinter.end_job()  # Initialization sequence
+
+        vprinter.begin_job()
+        printer.resetStats()
+        start = time.monotonic()
+        printer.printBitmap(width, height, bitmap, trim=trim)
+        printer.feed(1)
+        host_time = time.monotonic() - start
+        job = vprinter.end_job()
+        printer.close()
+
+    stats = printer.getStats()
+    print(f"{label:<24} host={host_time:.3f}s sent={stats['bytes_sent']} saved={stats['bytes_saved']}")
+    print(f"{'':<24} printer: {format_job(job)}")
+    return job
+
+
+def main():
+    for name in sorted(LOGOS):
+        logo = load_logo(name)
+        print(f"{name} {logo.width}x{logo.height}")
+        run("as is", logo.width, logo.height, logo.data, trim=False, flowcontrol="status")
+        run("blank rows elided", logo.width, logo.height, logo.data, flowcontrol="status")
+
+    width, height, bitmap = enlarge(load_logo(LOGO))
+    print(f"{LOGO} enlarged to {width}x{height}")
+    run("DC2 *", width, height, bitmap, raster=False, flowcontrol="status")
+    run("GS v 0", width, height, bitmap, raster=True, flowcontrol="status")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark image-to-bitmap conversion used by Adafruit_Thermal.printImage().
+Compares the tobytes() packing path against the per-pixel reference loop
+and checks that both produce the same bitmap.
+"""
+
+import os
+import sys
+import random
+import time
+
+# Add parent directory to path so we can import from project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from adafruit.Adafruit_Thermal import imageToBitmap, imageToBitmapSlow
+
+SIZES = [(384, 100), (384, 500), (384, 2000)]
+RUNS = 3
+
+
+def make_image(width, height):
+    """Random greyscale noise, dithered to 1-bit like a real photo would be."""
+    rnd = random.Random(width * height)
+    data = bytes(rnd.getrandbits(8) for _ in range(width * height))
+    return Image.frombytes('L', (width, height), data).convert('1')
+
+
+def best_of(fn, image):
+    best = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = fn(image)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def main():
+    print(f"{'size':>10} {'slow (ms)':>12} {'fast (ms)':>12} {'speedup':>9}  match")
+    for width, height in SIZES:
+        image = make_image(width, height)
+        slow_time, slow = best_of(imageToBitmapSlow, image)
+        fast_time, fast = best_of(imageToBitmap, image)
+        print(f"{width:>4}x{height:<5} {slow_time * 1000:>12.1f} {fast_time * 1000:>12.2f} "
+              f"{slow_time / fast_time:>8.0f}x  {slow == fast}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Measure input-to-pixels latency for a fast spin of the rotary encoder.
+Posts a burst of detents at a fixed interval (by default the fastest the
+encoder can produce with gpiozero's 0.1 s bounce_time: its pins can only
+change every 0.1 s, and a detent takes two changes of each) to the menu on an I2cLcd whose
+recording bus (lcd.fake_smbus) sleeps as long as the real bus would, and
+compares rendering from each callback (as service.py used to) against the
+coalescing input loop (lcd.input_loop), with and without acceleration, and
+with the LCD drawn by a frame-rate capped render thread (lcd.renderer).
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path so we can import from project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lcd.fake_smbus import FakeSMBus
+from lcd.i2c_lcd import I2cLcd, DEFAULT_I2C_ADDR
+from lcd.input_loop import InputLoop, parse_acceleration
+from lcd.lcd_menu_screen import MenuAction, MenuScreen
+from lcd.renderer import LcdRenderer
+from printing.batch import load_menu
+
+
+def get_menu():
+    """Every subtopic in the configured menu as one list, so a spin has room to run."""
+    return [MenuAction(subtopic, callback=lambda *args: None)
+            for actions in load_menu().values() for subtopic in actions]
+
+
+class DirectLoop(InputLoop):
+    """Renders on the posting thread, as the gpiozero callbacks used to."""
+
+    def rotate(self, direction):
+        with self._lock:
+            self.screen.focus_by(direction)
+            self.renders += 1
+        self._record([("rotate", self.turned)], time.monotonic())
+
+    def start(self):
+        return self
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def spin(loop_class, detents, interval, acceleration=(), block_writes=True, max_fps=None):
+    bus = FakeSMBus()
+    lcd = I2cLcd(1, DEFAULT_I2C_ADDR, 4, 20, bus=bus)
+    lcd.block_writes = block_writes
+    renderer = LcdRenderer(lcd, max_fps).start() if max_fps else None
+    screen = MenuScreen(renderer or lcd, "Welcome to", "AI In A Box", get_menu())
+    screen.start()
+    bus.realtime = True
+    latencies = []
+    loop = loop_class(screen, threading.RLock(), acceleration,
+                      on_latency=lambda seconds, kind: latencies.append(seconds * 1000)).start()
+
+    # The knob turns on schedule; with a callback still rendering the
+    # next detent waits, and that wait counts towards its latency
+    begin = time.monotonic()
+    for i in range(detents):
+        loop.turned = begin + i * interval
+        delay = loop.turned - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        loop.rotate(1)
+    loop.stop()
+    if renderer:
+        renderer.stop()
+    elapsed = time.monotonic() - begin
+    frames = renderer.frames if renderer else loop.renders
+    return loop, frames, latencies, screen.focus, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Input-to-pixels latency for a fast encoder spin.")
+    parser.add_argument("-n", "--detents", type=int, default=20, help="Detents in the spin")
+    parser.add_argument("--interval", type=float, default=0.2, help="Seconds between detents")
+    parser.add_argument("--acceleration", default="0.25:4,0.35:2", help="Acceleration table for the acceleration run")
+    parser.add_argument("--max-fps", type=float, default=20, help="Frame rate cap for the render thread run")
+    parser.add_argument("--write-byte", action="store_true", help="Send LCD writes one transaction each, not as block writes")
+    args = parser.parse_args()
+
+    runs = [
+        ("render per callback", DirectLoop, (), None),
+        ("input loop", InputLoop, (), None),
+        ("input loop, accel.", InputLoop, parse_acceleration(args.acceleration), None),
+        ("render thread", InputLoop, (), args.max_fps),
+    ]
+    print(f"{args.detents} detents, {args.interval * 1000:.0f} ms apart")
+    print(f"{'':<22} {'frames':>8} {'focus':>6} {'p50 ms':>7} {'p95 ms':>7} {'max ms':>7} {'done s':>7}")
+    for label, loop_class, acceleration, max_fps in runs:
+        loop, frames, latencies, focus, elapsed = spin(loop_class, args.detents, args.interval,
+                                               acceleration, not args.write_byte, max_fps)
+        print(f"{label:<22} {frames:>8} {focus:>6} {percentile(latencies, 0.5):>7.1f} "
+              f"{percentile(latencies, 0.95):>7.1f} {max(latencies):>7.1f} {elapsed:>7.2f}")
+        print(f"{'':<22} histogram (ms): " +
+              " ".join(f"<={bound}:{count}" for bound, count in loop.histogram.items() if count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Count the I2C traffic of menu rendering without an LCD attached.
+Drives the real MenuScreen over the configured menu and reports I2C byte
+writes for the first render, scrolling through every option and entering a
+submenu, for the old write-through behaviour (clear, then every character
+followed by an address command) and for the framebuffer. Then repeats the walk on I2cLcd over a
+recording bus (lcd.fake_smbus), sending each write as its own transaction
+and as SMBus block writes, with the estimated time on a 100 kHz bus.
+Last, times a cold and a warm start of I2cLcd (see its state_file) up to
+the first menu screen being on the LCD, with the bus taking as long as the
+real one would.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path so we can import from project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lcd.fake_smbus import FakeSMBus
+from lcd.i2c_lcd import I2cLcd, DEFAULT_I2C_ADDR
+from lcd.lcd_api import LcdApi
+from lcd.lcd_menu_screen import Menu, MenuAction, MenuBack, MenuScreen
+from printing.batch import load_menu
+
+# The PCF8574 backpack clocks each byte in as two nibbles, each written
+# with E high then low
+I2C_WRITES_PER_BYTE = 4
+
+
+class CountingLcd(LcdApi):
+    """LcdApi test double that counts the I2C writes a PCF8574 backpack would need."""
+
+    def __init__(self, num_lines=4, num_columns=20):
+        self.commands = 0
+        self.data = 0
+        LcdApi.__init__(self, num_lines, num_columns)
+
+    @property
+    def i2c_writes(self):
+        return (self.commands + self.data) * I2C_WRITES_PER_BYTE
+
+    def hal_write_command(self, cmd):
+        self.commands += 1
+
+    def hal_write_data(self, data):
+        self.data += 1
+
+    def hal_sleep_us(self, usecs):
+        pass
+
+
+class WriteThroughLcd(CountingLcd):
+    """The LcdApi behaviour before the framebuffer, for comparison."""
+
+    def clear(self):
+        self.hal_write_command(self.LCD_CLR)
+        self.hal_write_command(self.LCD_HOME)
+        LcdApi.clear(self)
+
+    def putchar(self, char):
+        if char != '\n':
+            self.hal_write_data(ord(char))
+        LcdApi.putchar(self, char)
+        self.hal_write_command(self.LCD_DDRAM | self._address(self.cursor_x, self.cursor_y))
+
+    def show(self, lines, marquee=None):
+        # MenuScreen used to write only the text, not the padding after it
+        self.clear()
+        for y, line in enumerate(lines):
+            self.move_to(0, y)
+            self.putstr(line.rstrip())
+        self.flush()
+
+    def flush(self):
+        self.shown = [bytearray(line) for line in self.frame]
+
+
+def get_menu():
+    """The configured menu, as Baiiab.get_menu() builds it, with no-op actions."""
+    return [Menu(topic, options=[MenuAction(subtopic, callback=lambda *args: None) for subtopic in actions] + [MenuBack()])
+            for topic, actions in load_menu().items()]
+
+
+def run(lcd, measure=lambda lcd: lcd.i2c_writes):
+    """(label, cost, steps) for each stage of the menu walk, and the final screen."""
+    screen = MenuScreen(lcd, "Welcome to", "AI In A Box", get_menu())
+    results = []
+
+    before = measure(lcd)
+    screen.start()
+    results.append(("first render", measure(lcd) - before, 1))
+
+    before = measure(lcd)
+    steps = len(screen.options)
+    for _ in range(steps):
+        screen.focus_next()
+    results.append(("scroll (per detent)", (measure(lcd) - before) / steps, steps))
+
+    before = measure(lcd)
+    screen.choose()
+    results.append(("enter submenu", measure(lcd) - before, 1))
+    return results, [line.decode("latin-1") for line in lcd.shown]
+
+
+def i2c_lcd(block_writes):
+    bus = FakeSMBus(keep=True)
+    lcd = I2cLcd(1, DEFAULT_I2C_ADDR, 4, 20, bus=bus)
+    lcd.block_writes = block_writes
+    return lcd
+
+
+def wire_bytes(bus):
+    return b"".join(t.data for t in bus.log)
+
+
+def startup(state_file):
+    """Seconds from creating the LCD to the menu being on it, and the I2C
+    transactions that took.
+    """
+    bus = FakeSMBus(realtime=True)
+    started = time.monotonic()
+    lcd = I2cLcd(1, DEFAULT_I2C_ADDR, 4, 20, bus=bus, state_file=state_file)
+    MenuScreen(lcd, "Welcome to", "AI In A Box", get_menu()).start()
+    return lcd, time.monotonic() - started, bus.transactions
+
+
+def main():
+    write_through, expected_text = run(WriteThroughLcd())
+    framebuffered, screen_text = run(CountingLcd())
+    assert screen_text == expected_text, (screen_text, expected_text)
+
+    print(f"{'I2C byte writes':<22} {'write-through':>14} {'framebuffer':>12}")
+    for (label, old, steps), (_, new, _) in zip(write_through, framebuffered):
+        print(f"{label:<22} {old:>14.0f} {new:>12.0f}")
+
+    # The same walk on I2cLcd over a recording bus
+    print()
+    print(f"{'I2C transactions (ms)':<22} {'write_byte':>14} {'block':>14}")
+    columns = []
+    for block_writes in (False, True):
+        transactions, text = run(i2c_lcd(block_writes), lambda lcd: lcd.bus.transactions)
+        seconds, _ = run(i2c_lcd(block_writes), lambda lcd: lcd.bus.elapsed())
+        assert text == screen_text
+        columns.append([(n, t) for (_, n, _), (_, t, _) in zip(transactions, seconds)])
+    for (label, _, _), (old_n, old_t), (new_n, new_t) in zip(framebuffered, *columns):
+        print(f"{label:<22} {old_n:>6.0f} ({old_t * 1000:>5.1f}) {new_n:>6.0f} ({new_t * 1000:>5.1f})")
+
+    single, block = i2c_lcd(False), i2c_lcd(True)
+    run(single, lambda lcd: 0)
+    run(block, lambda lcd: 0)
+    assert wire_bytes(single.bus) == wire_bytes(block.bus), "block writes changed the byte stream"
+
+    # A fresh boot, then a service restart finding the state file
+    print()
+    print(f"{'Startup':<22} {'init ms':>8} {'menu ms':>8} {'transactions':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        state_file = os.path.join(directory, "lcd")
+        for label in ("cold", "warm"):
+            lcd, seconds, transactions = startup(state_file)
+            assert lcd.warm_start == (label == "warm")
+            print(f"{label:<22} {lcd.init_time * 1000:>8.1f} {seconds * 1000:>8.1f} {transactions:>13}")
+
+if __name__ == "__main__":
+    main()
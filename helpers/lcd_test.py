@@ -10,4 +10,5 @@ lcd = I2cLcd(1, DEFAULT_I2C_ADDR, 4, 20)
 lcd.clear()
 lcd.move_to(0, 0)
 lcd.putstr("TEST")
+lcd.flush()
 
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark receipt printing against the virtual printer (no hardware needed).
+Prints the same receipt with unbuffered and buffered driver output and reports
+host time, host CPU time and what the virtual printer saw.
+"""
+
+import os
+import sys
+import time
+
+# Add parent directory to path so we can import from project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("LOGO_IMG", "sheep")
+os.environ.setdefault("TITLE", "AI In A Box")
+
+from adafruit.Adafruit_Thermal import Adafruit_Thermal
+from printing.virtual_printer import VirtualPrinter, format_job
+from Baiiab import Baiiab
+
+ADVICE = ("Never trust a sheep that claims to know the way home. "
+          "Always carry a spare umbrella for your umbrella.")
+TOPIC = "Bad Advice"
+
+
+def run(label, **driver_kwargs):
+    with VirtualPrinter(job_timeout=None) as vprinter:
+        printer = Adafruit_Thermal(vprinter.port, 19200, timeout=5, **driver_kwargs)
+        vprinter.end_job()  # Initialization sequence
+        baiiab = Baiiab(printer, None)
+
+        vprinter.begin_job()
+        start, cpu_start = time.monotonic(), time.process_time()
+        baiiab.print_advice_long(ADVICE, TOPIC)
+        host_time, cpu_time = time.monotonic() - start, time.process_time() - cpu_start
+        job = vprinter.end_job()
+        printer.close()
+
+    stats = printer.getStats()
+    print(f"{label:<16} host={host_time:.3f}s cpu={cpu_time:.3f}s blocked={stats['wait_time']:.3f}s "
+          f"sent={stats['bytes_sent']} status_round_trips={stats['status_round_trips']}")
+    print(f"{'':<16} printer: {format_job(job)}")
+    return job
+
+
+def main():
+    run("unbuffered")
+    run("buffered", buffered=True)
+    run("buffered+status", buffered=True, flowcontrol="status")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Calibrate print and feed timing for this printer and save it for the service.
+Prints a short test pattern; the printer's RX line (TX on the printer) must be
+connected so status queries can be answered.
+"""
+
+import argparse
+import os
+import sys
+
+# Add parent directory to path so we can import from project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adafruit.Adafruit_Thermal import Adafruit_Thermal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", default="/dev/ttyS0")
+    parser.add_argument("--baud", type=int, default=19200)
+    parser.add_argument("--config", default="conf/printer.ini",
+                        help="Where to save the calibrated times")
+    parser.add_argument("--margin", type=float, default=1.1,
+                        help="Safety factor applied to the measured times")
+    args = parser.parse_args()
+
+    printer = Adafruit_Thermal(args.port, args.baud, timeout=5)
+    print(f"Default times: print={printer.dotPrintTime * 1e6:.0f}us feed={printer.dotFeedTime * 1e6:.0f}us")
+    times = printer.calibrate(margin=args.margin)
+    if times is None:
+        print("Calibration failed: no status reply from the printer (is its TX line connected?)")
+        sys.exit(1)
+
+    print(f"Calibrated times: print={times[0]:.0f}us feed={times[1]:.0f}us")
+    printer.saveTimes(args.config)
+    print(f"Saved to {args.config}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,14 @@ from pathlib import Path
 
 sys.path.append(str(Path(f"{__file__}").parent.parent))
 
-import gfx.azure_monochrome as azure
+from gfx.assets import load_logo
 from dotenv import load_dotenv
 from adafruit.Adafruit_Thermal import *
 
 load_dotenv()
 
+azure = load_logo('azure_monochrome')
+
 #printer = Adafruit_Thermal("/dev/serial0", 19200, timeout=5)
 printer = Adafruit_Thermal('/dev/ttyS0', 19200, timeout=3)
 #p = Serial(devfile='/dev/ttyS0', baudrate=9600, bytesize=8, parity='N', timeout=3)
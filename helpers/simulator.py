@@ -102,6 +102,16 @@ class TerminalLCD:
                     self.buffer[self.cursor_y][self.cursor_x] = char
                     self.cursor_x += 1
     
+    def flush(self):
+        """Nothing to send; display() draws the buffer."""
+        pass
+
+    def show(self, lines, marquee=None):
+        """Replace the buffer with a whole screen, one string per line (no scrolling)."""
+        self.clear()
+        for y, line in enumerate(lines[:self.num_lines]):
+            self.buffer[y] = list(line[:self.num_columns].ljust(self.num_columns))
+
     def display(self, telemetry_info=None):
         """Render the LCD display to terminal."""
         # Clear terminal screen
@@ -139,7 +149,7 @@ class TerminalLCD:
 
 def action_callback(messages, menu_screen, title, baiiab, azure_openai_deployment):
     """Callback when an action is selected."""
-    topic = menu_screen.parent.title
+    topic = menu_screen.topic
     subtopic = title
     columns = menu_screen.columns
     
@@ -209,6 +219,9 @@ def action_callback(messages, menu_screen, title, baiiab, azure_openai_deploymen
         print("\nPress Enter to return to menu...", end='', flush=True)
         input()
 
+    # Back to the menu; choose() leaves the display to the action
+    menu_screen.render()
+
 
 def get_input():
     """Get single character input (with fallback for different systems)."""
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test that the commands printBitmap() sends (DC2 * bit images, GS v 0 raster
+images with their scale modes, ESC J feeds for blank rows) print exactly the
+bitmap asked for. Output goes to an in-memory spool and is decoded back into
+dot rows, so no printer is needed.
+"""
+
+import io
+import os
+import random
+import sys
+
+# Add parent directory to path so we can import from project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adafruit.Adafruit_Thermal import Adafruit_Thermal
+
+SEED = 268
+
+
+def printer(raster=True):
+    out = io.BytesIO()
+    p = Adafruit_Thermal(spool=out, raster=raster)
+    out.seek(0)
+    out.truncate()
+    return p, out
+
+
+def bits(data):
+    return "".join(f"{b:08b}" for b in data)
+
+
+def decode(stream):
+    """Dot rows printed by a stream of bitmap and feed commands, as strings
+    of '0' and '1' as wide as the data sent ('' for a fed row)."""
+    rows = []
+    i = 0
+    while i < len(stream):
+        if stream[i:i + 2] == b"\x12\x2a":
+            n, rowBytes = stream[i + 2], stream[i + 3]
+            i += 4
+            for _ in range(n):
+                rows.append(bits(stream[i:i + rowBytes]))
+                i += rowBytes
+        elif stream[i:i + 3] == b"\x1d\x76\x30":
+            mode, xL, xH, yL, yH = stream[i + 3:i + 8]
+            rowBytes, n = xL | xH << 8, yL | yH << 8
+            i += 8
+            for _ in range(n):
+                row = bits(stream[i:i + rowBytes])
+                i += rowBytes
+                if mode & 1:
+                    row = "".join(dot * 2 for dot in row)
+                rows += [row] * (2 if mode & 2 else 1)
+        elif stream[i:i + 2] == b"\x1b\x4a":
+            rows += [""] * stream[i + 2]
+            i += 3
+        else:
+            raise AssertionError(f"unexpected byte {stream[i]:#04x} at offset {i}")
+    assert i == len(stream), f"command cut short at offset {len(stream)}"
+    return rows
+
+
+def placed(rows, width, justify):
+    """The decoded rows as the printer lays them out within width dots."""
+    out = []
+    for row in rows:
+        pad = width - len(row)
+        if justify == "C":
+            row = "0" * (pad // 2) + row + "0" * (pad - pad // 2)
+        elif justify == "R":
+            row = "0" * pad + row
+        else:
+            row = row + "0" * pad
+        out.append(row)
+    return out
+
+
+def check(w, h, bitmap, justify="L", **kwargs):
+    raster = kwargs.pop("raster", True)
+    p, out = printer(raster)
+    p.printBitmap(w, h, bitmap, justify=justify, **kwargs)
+    rowBytes = (w + 7) // 8
+    expected = [bits(bitmap[y * rowBytes:(y + 1) * rowBytes]) for y in range(h)]
+    printed = decode(out.getvalue())
+    assert len(printed) == h, f"{w}x{h}: {len(printed)} dot rows printed"
+    width = max([rowBytes * 8] + [len(row) for row in printed])
+    printed = placed(printed, width, justify)
+    expected = placed(expected, width, justify)
+    for y, (got, want) in enumerate(zip(printed, expected)):
+        assert got == want, f"{w}x{h} justify={justify} {kwargs}: row {y}\n got {got}\nwant {want}"
+    return out.getvalue()
+
+
+def random_bitmap(rng, w, h):
+    """Random rows in runs of blank and inked ones, with blank margins."""
+    rowBytes = (w + 7) // 8
+    left = rng.randrange(rowBytes // 2 + 1)
+    right = rng.randrange((rowBytes - left) // 2 + 1)
+    bitmap = bytearray()
+    y = 0
+    while y < h:
+        run = min(h - y, rng.choice((1, 2, 5, 20, 300)))
+        blank = rng.random() < 0.4
+        for _ in range(run):
+            row = bytearray(rowBytes)
+            if not blank:
+                for x in range(left, rowBytes - right):
+                    row[x] = rng.randrange(256)
+            bitmap += row
+        y += run
+    # Bits past w in the last byte of each row aren't part of the image
+    if w % 8:
+        mask = 0xFF << (8 - w % 8) & 0xFF
+        for y in range(h):
+            bitmap[y * rowBytes + rowBytes - 1] &= mask
+    return w, h, bytes(bitmap)
+
+
+def doubled_bitmap(rng, w, h, x, y):
+    """A random w x h bitmap with each pixel repeated x times across and y times down."""
+    _, _, small = random_bitmap(rng, w, h)
+    rowBytes = (w + 7) // 8
+    bigBytes = (w * x + 7) // 8
+    bitmap = bytearray()
+    for row in range(h):
+        line = "".join(dot * x for dot in bits(small[row * rowBytes:(row + 1) * rowBytes])[:w])
+        line = line.ljust(bigBytes * 8, "0")
+        bitmap += int(line, 2).to_bytes(bigBytes, "big") * y
+    return w * x, h * y, bytes(bitmap)
+
+
+def test_random_bitmaps():
+    rng = random.Random(SEED)
+    for _ in range(200):
+        w, h, bitmap = random_bitmap(rng, rng.randrange(1, 385), rng.randrange(1, 600))
+        for justify in "LCR":
+            check(w, h, bitmap, justify)
+
+
+def test_doubled_bitmaps():
+    rng = random.Random(SEED)
+    sent = set()
+    for _ in range(200):
+        x, y = rng.choice(((2, 1), (1, 2), (2, 2)))
+        w, h, bitmap = doubled_bitmap(rng, rng.randrange(1, 193), rng.randrange(1, 300), x, y)
+        for justify in "LCR":
+            stream = check(w, h, bitmap, justify)
+            sent.add(b"\x1d\x76\x30" in stream)
+    # Some went out as scaled raster images and some as plain bit images
+    assert sent == {True, False}, sent
+
+
+def test_untrimmed_and_line_at_a_time():
+    rng = random.Random(SEED)
+    for _ in range(50):
+        w, h, bitmap = doubled_bitmap(rng, rng.randrange(1, 193), rng.randrange(1, 300), 2, 2)
+        stream = check(w, h, bitmap, trim=False)
+        assert b"\x1b\x4a" not in stream
+        stream = check(w, h, bitmap, LaaT=True)
+        assert b"\x1d\x76\x30" not in stream and b"\x1b\x4a" not in stream
+
+
+def test_without_raster_support():
+    rng = random.Random(SEED)
+    for _ in range(50):
+        w, h, bitmap = doubled_bitmap(rng, rng.randrange(1, 193), rng.randrange(1, 300), 2, 2)
+        stream = check(w, h, bitmap, raster=False)
+        assert b"\x1d\x76\x30" not in stream
+
+
+def test_blank_bitmap():
+    stream = check(384, 600, bytes(48 * 600))
+    # Fed, not sent: 255 + 255 + 90 rows
+    assert stream == b"\x1b\x4a\xff" b"\x1b\x4a\xff" b"\x1b\x4a\x5a", stream.hex(" ")
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test that the print spool (printing/spool.py) replays exactly the jobs that
+weren't completed, survives a torn final record, and stays within max_bytes.
+Each test works on a journal in its own temporary directory.
+"""
+
+import os
+import sys
+import tempfile
+
+# Add parent directory to path so we can import from project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from printing.spool import HEADER, JOURNAL, PrintSpool
+
+
+def add(spool, n, size=100):
+    return spool.add(bytes([n]) * size, 0.5 * n, {"printMode": n}, meta={"topic": f"job {n}"})
+
+
+def test_done_records_replayed():
+    with tempfile.TemporaryDirectory() as directory:
+        with PrintSpool(directory) as spool:
+            jobs = [add(spool, n) for n in (1, 2, 3)]
+            spool.complete(jobs[1])
+
+        with PrintSpool(directory) as spool:
+            pending = spool.pending()
+            assert [job.id for job in pending] == [jobs[0].id, jobs[2].id], pending
+            assert pending == [jobs[0], jobs[2]], pending
+            # Ids keep counting from the journal, so replayed jobs aren't confused with new ones
+            assert add(spool, 4).id > jobs[2].id
+
+
+def test_complete_all_truncates():
+    with tempfile.TemporaryDirectory() as directory:
+        with PrintSpool(directory) as spool:
+            jobs = [add(spool, n) for n in (1, 2)]
+            for job in jobs:
+                spool.complete(job)
+            assert os.path.getsize(os.path.join(directory, JOURNAL)) == 0
+
+        with PrintSpool(directory) as spool:
+            assert spool.pending() == []
+
+
+def test_torn_tail_recovered():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, JOURNAL)
+        with PrintSpool(directory) as spool:
+            first = add(spool, 1)
+            intact = os.path.getsize(path)
+            add(spool, 2)
+        # A crash part way through writing the second record
+        with open(path, "r+b") as f:
+            f.truncate(intact + HEADER.size + 10)
+
+        with PrintSpool(directory) as spool:
+            assert spool.pending() == [first], spool.pending()
+            assert os.path.getsize(path) == intact
+            # New records follow the last intact one
+            third = add(spool, 3)
+
+        with PrintSpool(directory) as spool:
+            assert spool.pending() == [first, third], spool.pending()
+
+
+def test_corrupt_tail_recovered():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, JOURNAL)
+        with PrintSpool(directory) as spool:
+            first = add(spool, 1)
+            intact = os.path.getsize(path)
+            add(spool, 2)
+        # The last record's payload doesn't match its CRC
+        with open(path, "r+b") as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b"\xff")
+
+        with PrintSpool(directory) as spool:
+            assert spool.pending() == [first], spool.pending()
+            assert os.path.getsize(path) == intact
+
+
+def test_compaction_drops_oldest():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, JOURNAL)
+        with PrintSpool(directory) as spool:
+            record = os.path.getsize(path)
+            add(spool, 1, size=1000)
+            record = os.path.getsize(path) - record
+        os.remove(path)
+
+        # Room for two jobs but not three
+        with PrintSpool(directory, max_bytes=2 * record + record // 2) as spool:
+            jobs = [add(spool, n, size=1000) for n in (1, 2, 3)]
+            assert spool.pending() == jobs[1:], spool.pending()
+            assert os.path.getsize(path) <= spool.max_bytes
+
+        with PrintSpool(directory) as spool:
+            assert spool.pending() == jobs[1:], spool.pending()
+
+
+def test_compaction_keeps_completed_out():
+    with tempfile.TemporaryDirectory() as directory:
+        with PrintSpool(directory, max_bytes=4096) as spool:
+            jobs = [add(spool, n, size=1000) for n in (1, 2, 3)]
+            spool.complete(jobs[0])
+            # Doesn't fit until job 1's record is compacted away; nothing pending is dropped
+            jobs.append(add(spool, 4, size=1000))
+            assert spool.pending() == jobs[1:], spool.pending()
+
+        with PrintSpool(directory) as spool:
+            assert spool.pending() == jobs[1:], spool.pending()
+
+
+def test_oversized_job_refused():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, JOURNAL)
+        with PrintSpool(directory, max_bytes=1024) as spool:
+            first = add(spool, 1)
+            assert add(spool, 2, size=2048) is None
+            # The refused job neither takes an id nor displaces what's already journaled
+            assert spool.pending() == [first], spool.pending()
+            assert add(spool, 3).id == first.id + 1
+
+        with PrintSpool(directory) as spool:
+            assert [job.id for job in spool.pending()] == [first.id, first.id + 1]
+            assert os.path.getsize(path) <= 1024
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test the PrintWorker (printing/worker.py) policies for presses that arrive
+while a receipt is printing: drop, coalesce and queue. The handler blocks
+until released, so the worker is busy for as long as each test needs.
+"""
+
+import os
+import sys
+import threading
+
+# Add parent directory to path so we can import from project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from printing.worker import PrintJob, PrintWorker
+
+TIMEOUT = 5
+
+
+class Harness:
+    """A started worker whose handler blocks until release() is called."""
+
+    def __init__(self, policy, max_queue=3):
+        self.printed = []
+        self.events = []
+        self._started = threading.Semaphore(0)
+        self._release = threading.Event()
+        self._idle = threading.Event()
+        self.worker = PrintWorker(self._handle, policy=policy, max_queue=max_queue,
+                                  on_status=self._status).start()
+
+    def _handle(self, job):
+        self._started.release()
+        assert self._release.wait(TIMEOUT), "handler never released"
+        self.printed.append(job.topic)
+        if job.topic == "fail":
+            raise RuntimeError("paper jam")
+
+    def _status(self, event, job, depth):
+        self.events.append((event, job.topic, depth))
+        if event in ("finished", "failed") and depth == 0:
+            self._idle.set()
+
+    def submit(self, topic):
+        return self.worker.submit(PrintJob([], topic, "receipt"))
+
+    def wait_started(self):
+        assert self._started.acquire(timeout=TIMEOUT), "job never started"
+
+    def release(self):
+        """Let every queued job through and wait until the worker is idle."""
+        self._release.set()
+        assert self._idle.wait(TIMEOUT), "worker never went idle"
+        self.worker.stop(TIMEOUT)
+
+
+def test_queue_policy():
+    h = Harness("queue", max_queue=2)
+    assert h.submit("a")
+    h.wait_started()
+    assert h.submit("b")
+    assert h.submit("c")
+    assert h.worker.depth == 3
+    assert not h.submit("d")
+    h.release()
+    assert h.printed == ["a", "b", "c"], h.printed
+    assert ("dropped", "d", 3) in h.events, h.events
+
+
+def test_drop_policy():
+    h = Harness("drop")
+    assert h.submit("a")
+    h.wait_started()
+    assert not h.submit("b")
+    assert h.worker.depth == 1
+    h.release()
+    assert h.printed == ["a"], h.printed
+    # Idle again, so the next press is taken
+    h = Harness("drop")
+    assert h.submit("c")
+    h.release()
+    assert h.printed == ["c"], h.printed
+
+
+def test_coalesce_policy():
+    h = Harness("coalesce")
+    assert h.submit("a")
+    h.wait_started()
+    assert h.submit("b")
+    assert h.submit("c")
+    assert h.submit("d")
+    # Only the newest press waits behind the active job
+    assert h.worker.depth == 2
+    h.release()
+    assert h.printed == ["a", "d"], h.printed
+
+
+def test_status_events():
+    h = Harness("queue")
+    assert h.submit("fail")
+    h.wait_started()
+    assert h.submit("b")
+    h.release()
+    assert h.events == [
+        ("queued", "fail", 1),
+        ("started", "fail", 1),
+        ("queued", "b", 2),
+        ("failed", "fail", 1),
+        ("started", "b", 1),
+        ("finished", "b", 0),
+    ], h.events
+
+
+def test_unknown_policy():
+    try:
+        PrintWorker(lambda job: None, policy="stack")
+    except ValueError:
+        pass
+    else:
+        assert False, "expected ValueError"
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
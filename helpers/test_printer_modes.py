@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test that skipping repeated mode commands (Adafruit_Thermal.writeMode())
+never leaves the printer in a different state than the one asked for.
+Output goes to an in-memory spool, so no printer is needed.
+"""
+
+import io
+import os
+import sys
+
+# Add parent directory to path so we can import from project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adafruit.Adafruit_Thermal import Adafruit_Thermal
+
+
+def printer():
+    out = io.BytesIO()
+    p = Adafruit_Thermal(spool=out)
+    out.seek(0)
+    out.truncate()
+    return p, out
+
+
+def test_repeated_size_skipped():
+    p, out = printer()
+    p.setSize('L')
+    p.println("A")
+    p.setSize('L')
+    p.println("B")
+    assert out.getvalue() == b'\x1d\x21\x11A\n' b'B\n', out.getvalue().hex(' ')
+
+
+def test_size_after_print_mode():
+    # ESC ! resets the size GS ! set, so the second GS ! must be sent
+    p, out = printer()
+    p.doubleHeightOn()
+    p.setSize('L')
+    p.println("A")
+    p.doubleHeightOff()
+    p.setSize('L')
+    p.println("B")
+    assert out.getvalue() == (b'\x1b\x21\x10' b'\x1d\x21\x11' b'A\n'
+                              b'\x1b\x21\x00' b'\x1d\x21\x11' b'B\n'), out.getvalue().hex(' ')
+
+
+def test_print_mode_after_size():
+    # And GS ! overrides the double height ESC ! set
+    p, out = printer()
+    p.doubleHeightOn()
+    p.setSize('S')
+    p.doubleHeightOn()
+    assert out.getvalue() == (b'\x1b\x21\x10' b'\x1d\x21\x00' b'\x1b\x21\x10'), out.getvalue().hex(' ')
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,81 @@
+"""
+Stand-in for smbus.SMBus that records transactions instead of sending them.
+
+Lets I2cLcd run without an LCD attached (pass bus=FakeSMBus()), e.g. to
+benchmark rendering off-device. Each write is recorded as one transaction,
+and the time it would have taken on the bus is estimated from the bus clock
+(9 clocks per byte including ACK, plus start, address and stop) and a fixed
+per-transaction software overhead for the ioctl() into the I2C driver.
+With realtime=True each write also sleeps for that long, so code driving the
+LCD sees roughly the delays it would on the device.
+
+Usage:
+    bus = FakeSMBus()
+    lcd = I2cLcd(1, DEFAULT_I2C_ADDR, 4, 20, bus=bus)
+    bus.reset()
+    ... render ...
+    print(bus.transactions, bus.bytes, bus.elapsed())
+"""
+
+import time
+from collections import namedtuple
+
+BUS_CLOCK_HZ = 100000        # Standard mode; the Pi's default
+TRANSACTION_OVERHEAD = 60e-6  # ioctl() and driver setup per transaction (seconds)
+
+Transaction = namedtuple("Transaction", ["kind", "addr", "data"])
+
+
+class FakeSMBus:
+    """Records the writes an SMBus would make."""
+
+    def __init__(self, bus_clock_hz=BUS_CLOCK_HZ, overhead=TRANSACTION_OVERHEAD, keep=False, realtime=False):
+        """
+        Args:
+            bus_clock_hz: I2C clock the estimates assume
+            overhead: Software cost of each transaction, in seconds
+            keep: Keep every Transaction in self.log (otherwise only counts)
+            realtime: Sleep for the estimated time of each transaction
+        """
+        self.bus_clock_hz = bus_clock_hz
+        self.overhead = overhead
+        self.keep = keep
+        self.realtime = realtime
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        self.transactions = 0
+        self.bytes = 0
+        self.log = []
+
+    def elapsed(self):
+        """Estimated seconds the recorded transactions would take."""
+        return self._duration(self.transactions, self.bytes)
+
+    def _duration(self, transactions, length):
+        # Start, stop and the address byte on top of the payload
+        clocks = 9 * (length + transactions) + 2 * transactions
+        return clocks / self.bus_clock_hz + self.overhead * transactions
+
+    def _record(self, kind, addr, data):
+        self.transactions += 1
+        self.bytes += len(data)
+        if self.keep:
+            self.log.append(Transaction(kind, addr, bytes(data)))
+        if self.realtime:
+            time.sleep(self._duration(1, len(data)))
+
+    def write_byte(self, addr, value):
+        self._record("write_byte", addr, (value,))
+
+    def write_byte_data(self, addr, cmd, value):
+        self._record("write_byte_data", addr, (cmd, value))
+
+    def write_i2c_block_data(self, addr, cmd, data):
+        if len(data) > 32:
+            raise ValueError("SMBus block writes are limited to 32 data bytes")
+        self._record("write_i2c_block_data", addr, [cmd] + list(data))
+
+    def close(self):
+        pass
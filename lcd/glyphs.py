@@ -0,0 +1,81 @@
+"""
+Custom glyphs for the HD44780's 8 CGRAM slots.
+
+Screen states refer to glyphs by private-use characters (e.g. SPINNER) rather
+than slot numbers. GlyphCache maps them onto the slots as the frame is drawn,
+uploading a glyph with LcdApi.custom_char() only when it isn't already
+resident, and reusing the least recently used slot when all 8 are taken.
+Glyphs in the frame being drawn are never evicted, so a frame may use up to 8.
+"""
+
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+CGRAM_SLOTS = 8
+
+# Private-use characters that stand for the glyphs in screen states
+SPIN_BAR = "\ue000"
+SPIN_SLASH = "\ue001"
+SPIN_DASH = "\ue002"
+SPIN_BACKSLASH = "\ue003"
+
+# 5x8 bitmaps, one byte per row (low 5 bits)
+GLYPHS = {
+    SPIN_BAR: (0x04, 0x04, 0x04, 0x04, 0x04, 0x04, 0x04, 0x00),  # |
+    SPIN_SLASH: (0x01, 0x01, 0x02, 0x04, 0x08, 0x10, 0x10, 0x00),  # /
+    SPIN_DASH: (0x00, 0x00, 0x00, 0x1f, 0x00, 0x00, 0x00, 0x00),  # -
+    SPIN_BACKSLASH: (0x10, 0x10, 0x08, 0x04, 0x02, 0x01, 0x01, 0x00),  # \ (a yen sign in the LCD's ROM)
+}
+
+# Frames of the "working on it" spinner
+SPINNER = SPIN_BAR + SPIN_SLASH + SPIN_DASH + SPIN_BACKSLASH
+
+
+class GlyphCache:
+    """Tracks which glyph is in each CGRAM slot of an LcdApi."""
+
+    def __init__(self, lcd, glyphs=GLYPHS):
+        """
+        Args:
+            lcd: The LcdApi whose CGRAM is managed; custom_char() is called
+                on the thread calling resolve()
+            glyphs: Character -> 5x8 bitmap for every glyph that may be used
+        """
+        self.lcd = lcd
+        self.glyphs = glyphs
+        self._slots = OrderedDict()  # glyph character -> slot, least recently used first
+        self.uploads = 0
+
+    def resolve(self, lines):
+        """
+        Map the glyph characters in a screen state onto CGRAM slots,
+        uploading any that aren't resident.
+
+        Returns:
+            The lines with each glyph character replaced by its slot's
+            character code (chr(0) to chr(7))
+        """
+        used = dict.fromkeys(char for line in lines for char in line if char in self.glyphs)
+        if not used:
+            return lines
+        if len(used) > CGRAM_SLOTS:
+            raise ValueError(f"A frame can use at most {CGRAM_SLOTS} custom glyphs, not {len(used)}")
+        for char in used:
+            self._load(char, used)
+        return tuple("".join(chr(self._slots[c]) if c in used else c for c in line) for line in lines)
+
+    def _load(self, char, pinned):
+        if char in self._slots:
+            self._slots.move_to_end(char)
+            return
+        if len(self._slots) < CGRAM_SLOTS:
+            slot = len(self._slots)
+        else:
+            victim = next(c for c in self._slots if c not in pinned)
+            slot = self._slots.pop(victim)
+        self.lcd.custom_char(slot, self.glyphs[char])
+        self._slots[char] = slot
+        self.uploads += 1
+        logger.debug(f"Loaded glyph {ord(char):#x} into CGRAM slot {slot}")
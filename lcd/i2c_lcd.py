@@ -1,9 +1,13 @@
 # https://github.com/dhylands/python_lcd/blob/master/lcd/i2c_lcd.py
 """Implements a HD44780 character LCD connected via PCF8574 on I2C."""
 
+import os
 import time
 
-import smbus
+try:
+    import smbus
+except ImportError:
+    smbus = None    # Only needed when no bus is passed in
 
 from lcd.lcd_api import LcdApi
 
@@ -18,17 +22,57 @@ MASK_E = 0x04
 SHIFT_BACKLIGHT = 3
 SHIFT_DATA = 4
 
+# Most data bytes an SMBus block write may carry (after the command byte)
+I2C_SMBUS_BLOCK_MAX = 32
+
+# Changes every time the Pi boots
+BOOT_ID_FILE = "/proc/sys/kernel/random/boot_id"
 
-class I2cLcd(LcdApi):
-    """Implements a HD44780 character LCD connected via PCF8574 on I2C."""
 
-    def __init__(self, port, i2c_addr, num_lines, num_columns):
+class I2cLcd(LcdApi):
+    """Implements a HD44780 character LCD connected via PCF8574 on I2C.
+
+    Every LCD byte takes four PCF8574 writes (two nibbles, each with E high
+    then low). Within a batch (see LcdApi.hal_batch_begin) these are
+    collected and sent as SMBus block writes of up to 33 bytes, rather than
+    one transaction per write. The PCF8574 has no registers, so the block
+    write's command byte is simply the first byte of the sequence.
+
+    The backpack can't reliably read the controller back, so whether it's
+    already initialized is remembered in a state file instead (see
+    __init__). After an initialization, init_time is how long it took in
+    seconds and warm_start whether it was a warm start.
+    """
+
+    # Set to False to send every write as its own transaction
+    block_writes = True
+
+    def __init__(self, port, i2c_addr, num_lines, num_columns, bus=None,
+                 state_file=None):
+        """Pass bus to use an already open SMBus (or a stand-in such as
+        lcd.fake_smbus.FakeSMBus) instead of opening port.
+
+        Pass state_file to warm start: once the LCD is initialized this
+        file records it, with the boot it happened in, and a later run
+        (e.g. after the service restarts) that finds it skips waiting for
+        the LCD to power up and clearing the display. This relies
+        on the LCD being powered with the Pi, so that it can only lose its
+        setup when the Pi reboots; put the file on a tmpfs such as /run or
+        /dev/shm to have it go away with the boot too.
+        """
+        started = time.monotonic()
         self.port = port
         self.i2c_addr = i2c_addr
-        self.bus = smbus.SMBus(port)
-        self.bus.write_byte(self.i2c_addr, 0)
-        time.sleep(0.020)    # Allow LCD time to powerup
-        # Send reset 3 times
+        self.bus = bus if bus is not None else smbus.SMBus(port)
+        self.state_file = state_file
+        self._batch_depth = 0
+        self._pending = bytearray()
+        self.warm_start = self._initialized(num_lines, num_columns)
+        if not self.warm_start:
+            self.bus.write_byte(self.i2c_addr, 0)
+            time.sleep(0.020)    # Allow LCD time to powerup
+        # Send reset 3 times (even on a warm start: should the last run have
+        # stopped half way through a byte, this gets the nibbles back in step)
         self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
         time.sleep(0.005)   # need to delay at least 4.1 msec
         self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
@@ -38,11 +82,47 @@ class I2cLcd(LcdApi):
         # Put LCD into 4 bit mode
         self.hal_write_init_nibble(self.LCD_FUNCTION)
         time.sleep(0.001)
-        LcdApi.__init__(self, num_lines, num_columns)
+        LcdApi.__init__(self, num_lines, num_columns, warm=self.warm_start)
         cmd = self.LCD_FUNCTION
         if num_lines > 1:
             cmd |= self.LCD_FUNCTION_2LINES
         self.hal_write_command(cmd)
+        self._record_initialized(num_lines, num_columns)
+        self.init_time = time.monotonic() - started
+
+    def _state(self, num_lines, num_columns):
+        """What the state file holds once this LCD is initialized."""
+        try:
+            with open(BOOT_ID_FILE) as f:
+                boot_id = f.read().strip()
+        except OSError:
+            boot_id = ""
+        return f"{boot_id} {self.port} {self.i2c_addr:#x} {num_lines}x{num_columns}\n"
+
+    def _initialized(self, num_lines, num_columns):
+        """Whether the state file says this LCD was initialized this boot."""
+        if not self.state_file:
+            return False
+        try:
+            with open(self.state_file) as f:
+                return f.read() == self._state(num_lines, num_columns)
+        except OSError:
+            return False
+
+    def _record_initialized(self, num_lines, num_columns):
+        """Writes the state file, if any; failing to is only a slower
+        start next time.
+        """
+        if not self.state_file:
+            return
+        try:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.state_file, "w") as f:
+                f.write(self._state(num_lines, num_columns))
+        except OSError:
+            pass
 
     def hal_write_init_nibble(self, nibble):
         """Writes an initialization nibble to the LCD.
@@ -55,43 +135,78 @@ class I2cLcd(LcdApi):
 
     def hal_backlight_on(self):
         """Allows the hal layer to turn the backlight on."""
-        self.bus.write_byte(self.i2c_addr, 1 << SHIFT_BACKLIGHT)
+        self._write(1 << SHIFT_BACKLIGHT)
 
     def hal_backlight_off(self):
         """Allows the hal layer to turn the backlight off."""
-        self.bus.write_byte(self.i2c_addr, 0)
+        self._write(0)
 
     def hal_sleep_us(self, usecs):
-        """Sleep for some time (given in microseconds)."""
-        time.sleep(usecs / 1000000)
+        """Sleep for some time (given in microseconds).
+
+        Within a batch the writes are still buffered, so there's nothing
+        to wait for yet; and once sent, each LCD byte takes four bytes on
+        the bus (over 300 usec at 100 kHz), longer than any of the short
+        delays the LCD asks for.
+        """
+        if not self._batch_depth:
+            time.sleep(usecs / 1000000)
+
+    def hal_batch_begin(self):
+        """Starts buffering writes to send as block transfers."""
+        self._batch_depth += 1
+
+    def hal_batch_end(self):
+        """Sends the buffered writes once the outermost batch ends."""
+        self._batch_depth -= 1
+        if not self._batch_depth:
+            self._send_pending()
+
+    def _write(self, *data):
+        """Writes bytes to the PCF8574, or buffers them within a batch."""
+        if self._batch_depth:
+            self._pending.extend(data)
+        else:
+            for byte in data:
+                self.bus.write_byte(self.i2c_addr, byte)
+
+    def _send_pending(self):
+        """Sends the buffered writes in as few transactions as possible."""
+        pending, self._pending = self._pending, bytearray()
+        if not self.block_writes:
+            for byte in pending:
+                self.bus.write_byte(self.i2c_addr, byte)
+            return
+        step = I2C_SMBUS_BLOCK_MAX + 1
+        for i in range(0, len(pending), step):
+            chunk = pending[i:i + step]
+            if len(chunk) == 1:
+                self.bus.write_byte(self.i2c_addr, chunk[0])
+            else:
+                self.bus.write_i2c_block_data(self.i2c_addr, chunk[0], list(chunk[1:]))
 
     def hal_write_command(self, cmd):
         """Writes a command to the LCD.
 
         Data is latched on the falling edge of E.
         """
-        byte = ((self.backlight << SHIFT_BACKLIGHT) |
+        high = ((self.backlight << SHIFT_BACKLIGHT) |
                 (((cmd >> 4) & 0x0f) << SHIFT_DATA))
-        self.bus.write_byte(self.i2c_addr, byte | MASK_E)
-        self.bus.write_byte(self.i2c_addr, byte)
-        byte = ((self.backlight << SHIFT_BACKLIGHT) |
-                ((cmd & 0x0f) << SHIFT_DATA))
-        self.bus.write_byte(self.i2c_addr, byte | MASK_E)
-        self.bus.write_byte(self.i2c_addr, byte)
+        low = ((self.backlight << SHIFT_BACKLIGHT) |
+               ((cmd & 0x0f) << SHIFT_DATA))
+        self._write(high | MASK_E, high, low | MASK_E, low)
         if cmd <= 3:
             # The home and clear commands require a worst
             # case delay of 4.1 msec
+            self._send_pending()
             time.sleep(0.005)
 
     def hal_write_data(self, data):
         """Write data to the LCD."""
-        byte = (MASK_RS |
+        high = (MASK_RS |
                 (self.backlight << SHIFT_BACKLIGHT) |
                 (((data >> 4) & 0x0f) << SHIFT_DATA))
-        self.bus.write_byte(self.i2c_addr, byte | MASK_E)
-        self.bus.write_byte(self.i2c_addr, byte)
-        byte = (MASK_RS |
-                (self.backlight << SHIFT_BACKLIGHT) |
-                ((data & 0x0f) << SHIFT_DATA))
-        self.bus.write_byte(self.i2c_addr, byte | MASK_E)
-        self.bus.write_byte(self.i2c_addr, byte)
\ No newline at end of file
+        low = (MASK_RS |
+               (self.backlight << SHIFT_BACKLIGHT) |
+               ((data & 0x0f) << SHIFT_DATA))
+        self._write(high | MASK_E, high, low | MASK_E, low)
\ No newline at end of file
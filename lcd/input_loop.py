@@ -0,0 +1,176 @@
+"""
+Input event loop for the menu.
+
+gpiozero calls the encoder and button callbacks on its own threads, and a
+render takes a few milliseconds of I2C traffic. Redrawing from each callback
+means a fast spin queues dozens of redraws that lag behind the knob. Instead
+the callbacks only post events, and a single UI thread drains them: all the
+rotation that piled up while the last frame was being drawn is folded into
+one net focus change and only the final state is rendered.
+
+Rotation can be accelerated: detents that follow each other quickly (in the
+same direction) move several options at a time, as set by an acceleration
+table of (max seconds since the previous detent, options per detent).
+
+The time from each event to the end of the render that shows it (input to
+pixels) is recorded in a histogram, and passed to on_latency if given. When
+the screen draws through an LcdRenderer that is when the renderer has the
+frame on the LCD, not when the screen handed it over.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+ROTATE = "rotate"
+PRESS = "press"
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def parse_acceleration(spec):
+    """
+    Parse an acceleration table such as "0.25:4,0.35:2".
+
+    Returns:
+        Tuple of (max_interval, steps), fastest first; empty if spec is empty
+    """
+    table = []
+    for entry in (spec or "").split(","):
+        if entry.strip():
+            interval, steps = entry.split(":")
+            table.append((float(interval), int(steps)))
+    return tuple(sorted(table))
+
+
+class InputLoop:
+    """Applies encoder and button events to a MenuScreen on a single UI thread."""
+
+    def __init__(self, screen, lock=None, acceleration=(), on_latency=None):
+        """
+        Args:
+            screen: The MenuScreen to drive
+            lock: Optional lock held while the screen is updated, shared
+                with anything else that draws on the LCD
+            acceleration: Table of (max seconds since the previous
+                detent, options moved per detent), fastest first; empty
+                for one option per detent
+            on_latency: Optional callback(seconds, kind) for every event,
+                called once the event is on screen (on the UI thread, or
+                the render thread with an LcdRenderer)
+        """
+        self.screen = screen
+        self._lock = lock or threading.RLock()
+        self.acceleration = tuple(acceleration or ())
+        self._on_latency = on_latency
+        self._events = deque()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._last_rotation = None  # (time, direction) of the previous detent
+        self.histogram = dict.fromkeys(LATENCY_BUCKETS_MS + (float("inf"),), 0)
+        self.renders = 0
+        self.events = 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="ui", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop once the events already posted have been handled."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def rotate(self, direction):
+        """Post one detent of rotation: 1 for the next option, -1 for the previous."""
+        now = time.monotonic()
+        steps = 1
+        with self._cond:
+            if self._last_rotation and self._last_rotation[1] == direction:
+                interval = now - self._last_rotation[0]
+                for max_interval, accelerated in self.acceleration:
+                    if interval <= max_interval:
+                        steps = accelerated
+                        break
+            self._last_rotation = (now, direction)
+            self._events.append((ROTATE, direction * steps, now))
+            self._cond.notify_all()
+
+    def press(self):
+        """Post a button press."""
+        with self._cond:
+            self._last_rotation = None
+            self._events.append((PRESS, 0, time.monotonic()))
+            self._cond.notify_all()
+
+    def latency_percentile(self, fraction):
+        """Upper bound (ms) of the histogram bucket holding the given fraction of events."""
+        total = sum(self.histogram.values())
+        if not total:
+            return None
+        seen = 0
+        for bound, count in self.histogram.items():
+            seen += count
+            if seen >= fraction * total:
+                return bound
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._events:
+                    self._cond.wait()
+                if not self._events:
+                    return
+                events = list(self._events)
+                self._events.clear()
+            try:
+                self._handle(events)
+            except Exception:
+                logger.exception(f"Failed to handle input events {events}")
+
+    def _handle(self, events):
+        """Apply a burst of events, rendering once per press and once for the rotation."""
+        delta = 0
+        waiting = []
+        with self._lock:
+            for kind, amount, posted in events:
+                waiting.append((kind, posted))
+                if kind == ROTATE:
+                    delta += amount
+                    continue
+                if delta:
+                    self.screen.focus_by(delta)
+                    self.renders += 1
+                    delta = 0
+                self.screen.choose()
+                self.renders += 1
+            if delta:
+                self.screen.focus_by(delta)
+                self.renders += 1
+        if len(events) > 1:
+            logger.debug(f"Coalesced {len(events)} input events")
+        when_shown = getattr(self.screen.lcd, "when_shown", None)
+        if when_shown:
+            when_shown(lambda shown: self._record(waiting, shown))
+        else:
+            self._record(waiting, time.monotonic())
+
+    def _record(self, events, shown):
+        for kind, posted in events:
+            latency = shown - posted
+            self.events += 1
+            for bound in self.histogram:
+                if latency * 1000 <= bound:
+                    self.histogram[bound] += 1
+                    break
+            if self._on_latency:
+                self._on_latency(latency, kind)
@@ -9,6 +9,11 @@ class LcdApi:
     them to the LCD.
 
     It is expected that a derived class will implement the hal_xxx functions.
+
+    Text is drawn into a shadow framebuffer: clear(), move_to(), putchar()
+    and putstr() only update it, and flush() sends the cells that differ
+    from what the LCD is showing, so redrawing a screen that has barely
+    changed costs a few bytes rather than a full rewrite.
     """
 
     # The following constant names were lifted from the avrlib lcd.h
@@ -48,7 +53,11 @@ class LcdApi:
     LCD_RW_WRITE = 0
     LCD_RW_READ = 1
 
-    def __init__(self, num_lines, num_columns):
+    def __init__(self, num_lines, num_columns, warm=False):
+        """Pass warm=True if the controller was already initialized (by an
+        earlier run, with the display since left powered) to skip clearing
+        it; whatever it still shows is overwritten by the first flush().
+        """
         self.num_lines = num_lines
         if self.num_lines > 4:
             self.num_lines = 4
@@ -59,9 +68,26 @@ class LcdApi:
         self.cursor_y = 0
         self.implied_newline = False
         self.backlight = True
-        self.display_off()
-        self.backlight_on()
-        self.clear()
+        # frame is what should be on the display, shown what is on it
+        self.frame = [bytearray(b' ' * self.num_columns)
+                      for _ in range(self.num_lines)]
+        self.shown = [bytearray(line) for line in self.frame]
+        self._order = None
+        # The controller's DDRAM address counter, or None if unknown
+        self.address = None
+        # The last display control command and backlight state sent, so
+        # repeating them costs nothing; None until sent
+        self.display_control = None
+        self.backlight_sent = None
+        if warm:
+            self.invalidate()
+            self.backlight_on()
+        else:
+            self.display_off()
+            self.backlight_on()
+            self.hal_write_command(self.LCD_CLR)
+            self.hal_write_command(self.LCD_HOME)
+            self.address = 0
         self.hal_write_command(self.LCD_ENTRY_MODE | self.LCD_ENTRY_INC)
         self.hide_cursor()
         self.display_on()
@@ -70,37 +96,122 @@ class LcdApi:
         """Clears the LCD display and moves the cursor to the top left
         corner.
         """
-        self.hal_write_command(self.LCD_CLR)
-        self.hal_write_command(self.LCD_HOME)
+        for line in self.frame:
+            line[:] = b' ' * self.num_columns
         self.cursor_x = 0
         self.cursor_y = 0
 
+    def flush(self):
+        """Sends the framebuffer cells that differ from what the LCD is
+        showing. Cells are visited in DDRAM address order and changed
+        ones grouped into runs; a single unchanged cell between two runs
+        is rewritten rather than paying for another address command.
+        The controller's address counter is tracked, so a run that
+        starts where auto-increment left off (including the next line,
+        where lines are contiguous in DDRAM) needs no address command.
+        """
+        order = self._ddram_order()
+        changed = [self.frame[y][x] != self.shown[y][x] for addr, y, x in order]
+        n = len(order)
+        i = 0
+        self.hal_batch_begin()
+        try:
+            while i < n:
+                if not changed[i]:
+                    i += 1
+                    continue
+                start = i
+                end = i = i + 1
+                while i < n and order[i][0] == self._next_address(order[i - 1][0]):
+                    if changed[i]:
+                        end = i + 1
+                    elif not (i + 1 < n and changed[i + 1] and
+                              order[i + 1][0] == self._next_address(order[i][0])):
+                        break
+                    i += 1
+                addr = order[start][0]
+                if addr != self.address:
+                    self.hal_write_command(self.LCD_DDRAM | addr)
+                for addr, y, x in order[start:end]:
+                    self.hal_write_data(self.frame[y][x])
+                    self.shown[y][x] = self.frame[y][x]
+                self.address = self._next_address(addr)
+        finally:
+            self.hal_batch_end()
+
+    def _ddram_order(self):
+        """(address, line, column) for every cell, in DDRAM address order."""
+        if self._order is None:
+            self._order = sorted((self._address(x, y), y, x)
+                                 for y in range(self.num_lines)
+                                 for x in range(self.num_columns))
+        return self._order
+
+    @staticmethod
+    def _next_address(addr):
+        """Where the address counter goes after writing at addr (in two
+        line mode DDRAM is 0x00-0x27 then 0x40-0x67, wrapping around).
+        """
+        addr += 1
+        if addr == 0x28:
+            return 0x40
+        if addr == 0x68:
+            return 0x00
+        return addr
+
+    def show(self, lines, marquee=None):
+        """Draws a whole screen, one string per line (cut to fit, with any
+        lines not given left blank), and flushes it to the LCD.
+
+        A marquee (text to scroll, see lcd.renderer) needs a render loop
+        to step it, so here it's ignored and the lines show as given.
+        """
+        self.clear()
+        for y, line in enumerate(lines[:self.num_lines]):
+            self.move_to(0, y)
+            self.putstr(line[:self.num_columns])
+        self.flush()
+
+    def invalidate(self):
+        """Forgets what the LCD is showing, so the next flush() rewrites
+        every cell (e.g. if the display may have been disturbed).
+        """
+        for want, have in zip(self.frame, self.shown):
+            have[:] = bytes(c ^ 0xFF for c in want)
+
     def show_cursor(self):
         """Causes the cursor to be made visible."""
-        self.hal_write_command(self.LCD_ON_CTRL | self.LCD_ON_DISPLAY |
-                               self.LCD_ON_CURSOR)
+        self._display_control(self.LCD_ON_DISPLAY | self.LCD_ON_CURSOR)
 
     def hide_cursor(self):
         """Causes the cursor to be hidden."""
-        self.hal_write_command(self.LCD_ON_CTRL | self.LCD_ON_DISPLAY)
+        self._display_control(self.LCD_ON_DISPLAY)
 
     def blink_cursor_on(self):
         """Turns on the cursor, and makes it blink."""
-        self.hal_write_command(self.LCD_ON_CTRL | self.LCD_ON_DISPLAY |
-                               self.LCD_ON_CURSOR | self.LCD_ON_BLINK)
+        self._display_control(self.LCD_ON_DISPLAY | self.LCD_ON_CURSOR |
+                              self.LCD_ON_BLINK)
 
     def blink_cursor_off(self):
         """Turns on the cursor, and makes it no blink (i.e. be solid)."""
-        self.hal_write_command(self.LCD_ON_CTRL | self.LCD_ON_DISPLAY |
-                               self.LCD_ON_CURSOR)
+        self._display_control(self.LCD_ON_DISPLAY | self.LCD_ON_CURSOR)
 
     def display_on(self):
         """Turns on (i.e. unblanks) the LCD."""
-        self.hal_write_command(self.LCD_ON_CTRL | self.LCD_ON_DISPLAY)
+        self._display_control(self.LCD_ON_DISPLAY)
 
     def display_off(self):
         """Turns off (i.e. blanks) the LCD."""
-        self.hal_write_command(self.LCD_ON_CTRL)
+        self._display_control(0)
+
+    def _display_control(self, flags):
+        """Sends a display on/off control command with the given flags,
+        unless it's the one already in effect.
+        """
+        cmd = self.LCD_ON_CTRL | flags
+        if cmd != self.display_control:
+            self.hal_write_command(cmd)
+            self.display_control = cmd
 
     def backlight_on(self):
         """Turns the backlight on.
@@ -109,7 +220,9 @@ class LcdApi:
         controls, so this allows the hal to pass through the command.
         """
         self.backlight = True
-        self.hal_backlight_on()
+        if self.backlight_sent is not True:
+            self.hal_backlight_on()
+            self.backlight_sent = True
 
     def backlight_off(self):
         """Turns the backlight off.
@@ -118,7 +231,9 @@ class LcdApi:
         controls, so this allows the hal to pass through the command.
         """
         self.backlight = False
-        self.hal_backlight_off()
+        if self.backlight_sent is not False:
+            self.hal_backlight_off()
+            self.backlight_sent = False
 
     def move_to(self, cursor_x, cursor_y):
         """Moves the cursor position to the indicated position. The cursor
@@ -126,12 +241,15 @@ class LcdApi:
         """
         self.cursor_x = cursor_x
         self.cursor_y = cursor_y
+
+    def _address(self, cursor_x, cursor_y):
+        """DDRAM address of a cursor position."""
         addr = cursor_x & 0x3f
         if cursor_y & 1:
             addr += 0x40    # Lines 1 & 3 add 0x40
         if cursor_y & 2:    # Lines 2 & 3 add number of columns
             addr += self.num_columns
-        self.hal_write_command(self.LCD_DDRAM | addr)
+        return addr
 
     def putchar(self, char):
         """Writes the indicated character to the LCD at the current cursor
@@ -145,7 +263,8 @@ class LcdApi:
             else:
                 self.cursor_x = self.num_columns
         else:
-            self.hal_write_data(ord(char))
+            code = ord(char)
+            self.frame[self.cursor_y][self.cursor_x] = code if code < 256 else ord('?')
             self.cursor_x += 1
         if self.cursor_x >= self.num_columns:
             self.cursor_x = 0
@@ -153,7 +272,6 @@ class LcdApi:
             self.implied_newline = (char != '\n')
         if self.cursor_y >= self.num_lines:
             self.cursor_y = 0
-        self.move_to(self.cursor_x, self.cursor_y)
 
     def putstr(self, string):
         """Write the indicated string to the LCD at the current cursor
@@ -167,12 +285,16 @@ class LcdApi:
         as chr(0) through chr(7).
         """
         location &= 0x7
-        self.hal_write_command(self.LCD_CGRAM | (location << 3))
-        self.hal_sleep_us(40)
-        for i in range(8):
-            self.hal_write_data(charmap[i])
+        self.address = None  # The address counter now points into CGRAM
+        self.hal_batch_begin()
+        try:
+            self.hal_write_command(self.LCD_CGRAM | (location << 3))
             self.hal_sleep_us(40)
-        self.move_to(self.cursor_x, self.cursor_y)
+            for i in range(8):
+                self.hal_write_data(charmap[i])
+                self.hal_sleep_us(40)
+        finally:
+            self.hal_batch_end()
 
     def hal_backlight_on(self):
         """Allows the hal layer to turn the backlight on.
@@ -188,6 +310,23 @@ class LcdApi:
         """
         pass
 
+    def hal_batch_begin(self):
+        """Marks the start of a run of writes that the hal layer may
+        buffer and send together. Calls may nest.
+
+        If desired, a derived HAL class will implement this function.
+        """
+        pass
+
+    def hal_batch_end(self):
+        """Marks the end of a run of writes started by hal_batch_begin();
+        anything buffered must be sent by the time the outermost one
+        returns.
+
+        If desired, a derived HAL class will implement this function.
+        """
+        pass
+
     def hal_write_command(self, cmd):
         """Write a command to the LCD.
 
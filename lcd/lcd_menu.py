@@ -54,6 +54,7 @@ class Menu:
 
         self._render_cursor()
         self._render_options()
+        self.lcd.flush()
 
     def _render_cursor(self):
         for l in range(0, self.lines):
@@ -1,6 +1,9 @@
 # https://github.com/jplattel/upymenu/blob/master/upymenu/__init__.py
 # https://github.com/jplattel/upymenu/issues/4
 import math
+from functools import partial
+
+from lcd.renderer import Marquee
 
 class MenuScreen:
     def __init__(self, lcd, title="", subtitle="", options=[]):
@@ -14,88 +17,88 @@ class MenuScreen:
 
         self.active = False
         self.parent = None
+        # The top level options, laid out like any other menu
+        self.start_menu = Menu(title, options=options)
+        self.menu = self.start_menu
+        # The menus above the current one, innermost last
+        self.stack = []
+        # Every node by its path of titles from the top, e.g.
+        # ("Advice", "Bad"), built once so goto() needn't search
+        self.index = self.start_menu.index()
         
         # Make sure that we leave room for the title 
         self.start_line = 0
         if title: self.start_line = self.start_line + 1
         if subtitle: self.start_line = self.start_line + 1
+        # The title lines never change, so center them once
+        self.title_lines = tuple(self._render_title())
 
     def __str__(self):
         return self.title
     
     # Starts the menu, used at root level to start the interface.
-    # Or when navigating to a submenu or parten
     def start(self):
         self.active = True  # Set the screen as active
+        self.stack = []
+        self._enter(self.start_menu)
+        return self
 
+    # Show a menu, with the focus where it was when the menu was last left
+    def _enter(self, menu):
+        self.menu = menu
+        self.options = menu.options
+        self.parent = menu if menu is not self.start_menu else None
         # We start on the first option by default (not 0 to prevent ZeroDivision errors )
-        self.focus = 1
-        # Chunk the list and calculate the viewport:
-        self.options_chunked = list(self._chunk_options())
-        #print("options chunked = " + str(self.options_chunked))
+        self.focus = min(menu.focus, len(menu.options)) or 1
+        # The menu's pages, laid out once per menu and reused
+        self.pages = menu.pages(self.columns, self.lines - self.start_line)
         self.render()
-        return self
+
+    # The titles leading from the top level to the focused option
+    @property
+    def path(self):
+        return self.menu.path + (self.options[self.focus - 1].title,)
+
+    # The title of the menu the focused option is in, or "" at the top
+    # level (whose title is the screen's, not a topic)
+    @property
+    def topic(self):
+        return self.menu.title if self.menu is not self.start_menu else ""
 
     # Renders the menu, also when refreshing (when changing select)
     def render(self):
         #print('self.render()')
         # We only render the active screen, not the others
-        if not self.active or not self.options_chunked:
+        if not self.active or not self.pages:
             return
 
-        self.viewport = self._get_viewport()
-        self.lcd.clear()
-        #self.lcd.move_to(0, self.start_line)
+        # Hand the display a finished screen; an LcdRenderer draws it on its
+        # own thread, an LcdApi draws it (sending only what changed) now
+        self.lcd.show(self.frame(), self.marquee())
 
-        self._render_title()
-        self._render_cursor()
-        self._render_options()
+    # The screen as it should look, one string per line: the current page
+    # with the cursor on the focused line
+    def frame(self):
+        page = self.pages[self._current_chunk()]
+        row = (self.focus - 1) % (self.lines - self.start_line)
+        return self.title_lines + tuple(">" + line[1:] if l == row else line
+                                        for l, line in enumerate(page))
 
-    def _get_viewport(self):
-        #print('self.current_chunk=' + str(self._current_chunk()))
-        #print('self.options_chunked=' + str(self.options_chunked))
-        viewport = self.options_chunked[self._current_chunk()]
-        #print('self.viewport=' + str(viewport))
-        return viewport
+    # The focused option's title, to scroll in its line if it's cut short
+    def marquee(self):
+        title = self.options[self.focus - 1].title
+        if len(title) <= self.columns - 2:
+            return None
+        row = (self.focus - 1) % (self.lines - self.start_line)
+        return Marquee(2, self.start_line + row, self.columns - 2, title)
 
     def _render_title(self):
+        lines = []
         if self.title:
-            self.lcd.move_to(0, 0)
-            #print(self.title)
-            self.lcd.putstr(self.title.center(self.columns))
-            self.lcd.move_to(0, 1)
+            lines.append(self.title.center(self.columns))
         if self.subtitle:
-            #print(self.subtitle)
-            self.lcd.putstr(self.subtitle.center(self.columns))
-            self.lcd.move_to(0, 2)
-
-    def _render_cursor(self):
-        for l in range(0, self.lines - self.start_line):
-            self.lcd.move_to(0, l + self.start_line)
-            # If the current position matches the focus, render
-            # the cursor otherwise, render an empty space
-            #print('l=' + str(l) + ';self.focus=' + str(self.focus))
-            if l == ((self.focus - 1) % 2):
-                #print('adding >')
-                self.lcd.putstr(">")
-            else:
-                #print('adding space')
-                self.lcd.putstr(" ")
-
-    def _render_options(self):
-        # Render the options:
-        for l, option in enumerate(self.viewport):
-            self.lcd.move_to(2, l + self.start_line)  # Move to the line
-            # And render the longest possible string on the screen
-            self.lcd.putstr(option.title[: self.columns - 1])
-
-    # Chunk the options to only render the ones in the viewport
-    def _chunk_options(self):
-        #print('_chunk_options')
-        for i in range(0, len(self.options), self.lines - self.start_line):
-            #print('yielding; i=' + str(i) + ';self.lines=' + str(self.lines))
-            #print(self.options[i : i + self.lines - self.start_line])
-            yield self.options[i : i + self.lines - self.start_line]
+            lines.append(self.subtitle.center(self.columns))
+        return lines
 
     # Get the current chunk based on the focus position
 #    def _current_chunk(self):
@@ -120,6 +123,12 @@ class MenuScreen:
             self.focus = len(self.options)
         self.render()
 
+    # Move the focus n options down (or up if negative), wrapping around,
+    # with a single render however far it moves
+    def focus_by(self, n):
+        self.focus = (self.focus - 1 + n) % len(self.options) + 1
+        self.render()
+
     # Focus on the option n in the menu
     def focus_set(self, n):
         #print('focus_set:' + n)
@@ -133,45 +142,104 @@ class MenuScreen:
 
         if type(chosen_option) == Menu:
             #print('choose()::Processing Menu')
-            self.parent = chosen_option
-            self.options = chosen_option.options
-            self.start()
+            self.menu.focus = self.focus
+            self.stack.append(self.menu)
+            self._enter(chosen_option)
         elif type(chosen_option) == MenuAction:
             #print('choose()::Processing MenuAction')
-            chosen_option.cb(self)  # Execute the callback function
-            self.options = self.start_options
-            self.parent = None
-            self.start()
+            # Execute the callback function. It owns the display from here
+            # (to show progress, say) and calls render() to bring the menu
+            # back; the focus stays where it was
+            chosen_option.cb(self)
+        elif type(chosen_option) == MenuBack:
+            self.back()
         elif type(chosen_option) == MenuNoop:
             #print('choose()::Processing MenuNoop')
             return self
 
-    def _choose_menu(self, submenu):
-        self.active = False
-        submenu.parent_menu = self
-        return submenu.start(self.lcd)  # Start the submenu or parent
+    # Go up to the menu above this one, if any
+    def back(self):
+        if self.stack:
+            self.menu.focus = self.focus
+            self._enter(self.stack.pop())
+
+    # Go straight to the node at path (see self.index): into it if it's a
+    # menu, otherwise into its menu with the focus on it
+    def goto(self, path):
+        path = tuple(path)
+        node = self.index[path]
+        if type(node) != Menu:
+            node.parent_menu.focus = node.parent_menu.options.index(node) + 1
+            node = node.parent_menu
+        self.menu.focus = self.focus
+        self.stack = [self.index[path[:i]] for i in range(len(node.path))]
+        self._enter(node)
 
 
 class Menu:
     def __init__(self, title, options=[]):
         self.title = title
-        self.options = options
         self.parent_menu = None
+        self.options = options
+        # Where the focus was when this menu was last left
+        self.focus = 1
 
     def __repr__(self):
         return f'Menu(\'{self.title}\')'
 
-    # Navigate to the parent (if the current menu is a submenu)
+    # Changing the options drops the page layouts made from them, and
+    # makes this menu their parent
+    @property
+    def options(self):
+        return self._options
+
+    @options.setter
+    def options(self, options):
+        self._options = options
+        self._pages = {}
+        for option in options:
+            option.parent_menu = self
+
+    # Titles from the top level menu down to this one (the top level
+    # menu's own title isn't part of it)
+    @property
+    def path(self):
+        if self.parent_menu is None:
+            return ()
+        return self.parent_menu.path + (self.title,)
+
+    # Every node below this menu by its path of titles from here
+    def index(self, path=()):
+        nodes = {path: self}
+        for option in self.options:
+            if type(option) == Menu:
+                nodes.update(option.index(path + (option.title,)))
+            elif type(option) != MenuBack:
+                nodes[path + (option.title,)] = option
+        return nodes
+
+    # The options laid out in pages of rows lines for an LCD columns wide:
+    # each line is padded to the full width, with the option's title cut to
+    # fit after two columns for the cursor. Made once per size and reused.
+    def pages(self, columns, rows):
+        if (columns, rows) not in self._pages:
+            lines = ["  " + option.title[: columns - 2] for option in self.options]
+            lines = [line.ljust(columns) for line in lines]
+            self._pages[(columns, rows)] = [
+                tuple(lines[i : i + rows]) + (" " * columns,) * (rows - len(lines[i : i + rows]))
+                for i in range(0, len(lines), rows)]
+        return self._pages[(columns, rows)]
+
+    # The menu this one is in, or None at the top level
     def parent(self):
-        if self.parent_menu:
-            self.active = False
-            return self.parent_menu.start(self.lcd)
+        return self.parent_menu
 
 
 class MenuAction:
     def __init__(self, title, callback):
         self.title = title
         self.callback = callback
+        self.parent_menu = None
 
     def cb(self, menu_screen):
         return self.callback(menu_screen, self.title)
@@ -183,6 +251,36 @@ class MenuAction:
 class MenuNoop:
     def __init__(self, title):
         self.title = title
+        self.parent_menu = None
 
     def __repr__(self):
         return f'MenuNoop(\'{self.title}\')'
+
+
+# Goes back up to the menu above
+class MenuBack:
+    def __init__(self, title="< Back"):
+        self.title = title
+        self.parent_menu = None
+
+    def __repr__(self):
+        return f'MenuBack(\'{self.title}\')'
+
+
+# Builds the options of a menu tree from nested dicts, e.g. as loaded from
+# conf/menu.json: a dict is a menu (nested as deep as needed, ending with a
+# way back up) and anything else an action, calling callback(entry,
+# menu_screen, title). Given the LCD's columns and option rows, each
+# submenu's page layouts (see Menu.pages()) are made now rather than on
+# first use.
+def build_menu(menu_data, callback, columns=None, rows=None):
+    options = []
+    for title, entry in menu_data.items():
+        if isinstance(entry, dict):
+            menu = Menu(title, options=build_menu(entry, callback, columns, rows) + [MenuBack()])
+            if columns and rows:
+                menu.pages(columns, rows)
+            options.append(menu)
+        else:
+            options.append(MenuAction(title, callback=partial(callback, entry)))
+    return options
@@ -0,0 +1,217 @@
+"""
+LCD render thread.
+
+I2C transfers to the LCD take a few milliseconds per frame. Rather than make
+whichever thread changed the screen (the UI thread, the print worker) wait on
+them, the renderer's thread owns the LCD and callers hand it screen states:
+tuples of strings, one per line. show() only swaps in the newest state and
+returns; the thread draws the latest state it has, at most max_fps times a
+second, and LcdApi's framebuffer sends only the cells that changed since the
+previous frame. States superseded before they're drawn are skipped.
+
+The renderer has the LCD's num_lines and num_columns and a show() method, as
+LcdApi does, so MenuScreen can draw through either. when_shown() reports when
+the states shown so far are actually on the LCD, e.g. to measure latency.
+
+Screen states may contain custom glyphs (see lcd.glyphs), which are loaded
+into CGRAM as they're drawn. animate() runs a one-cell animation such as
+lcd.glyphs.SPINNER on top of whatever is shown, driven by the render thread's
+own clock: once its glyphs are resident each step costs a single cell write,
+and nothing on the print or API path has to keep it going.
+
+A state may also carry a Marquee: text too long for its place on one line,
+which the render thread scrolls through that place while the state is shown.
+Each step rewrites only that line's changed cells. Animation and marquee
+steps don't count towards max_fps, so they never hold back a new state.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from lcd.glyphs import GlyphCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_FPS = 20
+
+Animation = namedtuple("Animation", ["x", "y", "frames", "interval", "started"])
+
+# Scroll text through width cells of line y from column x
+Marquee = namedtuple("Marquee", ["x", "y", "width", "text"])
+
+MARQUEE_INTERVAL = 0.3  # Seconds per one-character step
+MARQUEE_PAUSE = 1.5     # Seconds the start of the text stays put each time round
+MARQUEE_GAP = "   "     # Between the end of the text and its start coming round again
+
+
+class LcdRenderer:
+    """Draws screen states on an LcdApi from a dedicated thread."""
+
+    def __init__(self, lcd, max_fps=DEFAULT_MAX_FPS):
+        """
+        Args:
+            lcd: The LcdApi to draw on; only the render thread touches it
+                once started
+            max_fps: Most frames drawn per second
+        """
+        self.lcd = lcd
+        self.num_lines = lcd.num_lines
+        self.num_columns = lcd.num_columns
+        self.min_interval = 1.0 / max_fps
+        self.glyphs = GlyphCache(lcd)
+        self._pending = None
+        self._state = None      # Latest state drawn, before any animation
+        self._shown = None      # What's on the LCD, animation included
+        self._animation = None
+        self._marquee = None
+        self._marquee_started = None
+        self._tick = None       # When the next animation or marquee step is due
+        self._requested = 0     # Number of states passed to show()
+        self._drawn = 0         # Number of those now on the LCD (or skipped)
+        self._waiters = []      # (state number, callback) for when_shown()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.frames = 0
+        self.skipped = 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="lcd-render", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop once the latest state has been drawn."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def show(self, lines, marquee=None):
+        """Queue a screen state (one string per line, and optionally a
+        Marquee to scroll while it's shown) to be drawn; doesn't wait for it.
+        """
+        frame = tuple(lines)
+        with self._cond:
+            if self._pending is not None:
+                self.skipped += 1
+            self._requested += 1
+            self._pending = (self._requested, frame, marquee)
+            self._cond.notify_all()
+
+    def animate(self, x, y, frames, interval=0.15):
+        """Cycle the cell at (x, y) through the characters in frames, one
+        every interval seconds, over whatever state is shown, until
+        stop_animation(). Replaces any animation already running.
+        """
+        with self._cond:
+            self._animation = Animation(x, y, frames, interval, time.monotonic())
+            self._tick = self._animation.started
+            self._cond.notify_all()
+
+    def stop_animation(self):
+        with self._cond:
+            if self._animation:
+                self._animation = None
+                self._tick = 0      # Redraw the state without it
+                self._cond.notify_all()
+
+    def when_shown(self, callback):
+        """Call callback(time.monotonic()) once the last state passed to
+        show() (or a newer one) is on the LCD: from the render thread, or
+        right away if it already is.
+        """
+        with self._cond:
+            if self._drawn < self._requested:
+                self._waiters.append((self._requested, callback))
+                return
+        callback(time.monotonic())
+
+    def _next_tick(self):
+        """When the animation or marquee (if any) is next due to change, or None."""
+        now = time.monotonic()
+        ticks = []
+        if self._animation is not None:
+            ticks.append((self._animation.started, self._animation.interval))
+        if self._marquee is not None:
+            ticks.append((self._marquee_started, MARQUEE_INTERVAL))
+        return min((started + (int((now - started) / interval) + 1) * interval for started, interval in ticks),
+                   default=None)
+
+    def _run(self):
+        last = 0
+        while True:
+            with self._cond:
+                while self._running and self._pending is None:
+                    if self._tick is not None and self._tick <= time.monotonic():
+                        break
+                    self._cond.wait(None if self._tick is None else self._tick - time.monotonic())
+                if self._pending is None and not self._running:
+                    return
+                new_state = self._pending is not None
+            if new_state:
+                # Let more changes pile up rather than draw faster than max_fps
+                wait = last + self.min_interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+            with self._cond:
+                number = None
+                if self._pending is not None:
+                    (number, self._state, marquee), self._pending = self._pending, None
+                    if marquee != self._marquee:
+                        self._marquee = marquee
+                        self._marquee_started = time.monotonic()
+                frame = self._compose()
+                self._tick = self._next_tick()
+            if frame is not None and frame != self._shown:
+                if new_state:
+                    last = time.monotonic()
+                try:
+                    self.lcd.show(self.glyphs.resolve(frame))
+                    self._shown = frame
+                    self.frames += 1
+                except Exception:
+                    logger.exception("Failed to draw LCD frame")
+            if number is not None:
+                self._done(number)
+
+    def _compose(self):
+        """The latest state with the marquee and animation's current steps on top."""
+        if self._state is None:
+            return None
+        now = time.monotonic()
+        lines = list(self._state)
+        marquee = self._marquee
+        if marquee is not None:
+            loop = marquee.text + MARQUEE_GAP
+            phase = (now - self._marquee_started) % (MARQUEE_PAUSE + len(loop) * MARQUEE_INTERVAL)
+            offset = 0 if phase < MARQUEE_PAUSE else (int((phase - MARQUEE_PAUSE) / MARQUEE_INTERVAL) + 1) % len(loop)
+            self._overlay(lines, marquee.x, marquee.y, (loop + loop)[offset:offset + marquee.width])
+        animation = self._animation
+        if animation is not None:
+            step = int((now - animation.started) / animation.interval)
+            self._overlay(lines, animation.x, animation.y, animation.frames[step % len(animation.frames)])
+        return tuple(lines)
+
+    @staticmethod
+    def _overlay(lines, x, y, text):
+        while len(lines) <= y:
+            lines.append("")
+        line = lines[y].ljust(x + len(text))
+        lines[y] = line[:x] + text + line[x + len(text):]
+
+    def _done(self, number):
+        now = time.monotonic()
+        with self._cond:
+            self._drawn = number
+            ready = [callback for target, callback in self._waiters if target <= number]
+            self._waiters = [(target, callback) for target, callback in self._waiters if target > number]
+        for callback in ready:
+            try:
+                callback(now)
+            except Exception:
+                logger.exception("LCD when_shown callback failed")
@@ -0,0 +1,4 @@
+"""Receipt printing support for the thermal printer."""
+from .receipt import ReceiptCompiler, CompiledSegment
+
+__all__ = ['ReceiptCompiler', 'CompiledSegment']
@@ -0,0 +1,123 @@
+"""
+Batch receipt rendering for pre-printing stacks of receipts.
+
+Renders receipts for menu topics/subtopics into raw ESC/POS spool files, one
+per receipt, without a printer attached. The files can then be sent to a CUPS
+queue in bulk:
+
+    python -m printing.batch --count 20 --topic Advice --subtopic Bad
+    for f in batch/*.prn; do lp -d thermal -o raw "$f"; done
+
+Advice comes from Azure OpenAI (configured as for the service) with the
+offline responses as a fallback, or from the offline responses only with
+--offline.
+"""
+
+import argparse
+import logging
+import os
+from ast import literal_eval
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUT_DIR = "batch"
+
+
+def load_menu(path="conf/menu.json"):
+    """Menu topics -> subtopics -> chat messages, as used by Baiiab.get_menu()."""
+    with open(path, "r") as f:
+        return literal_eval(f.read())
+
+
+def select(menu, topics=None, subtopics=None):
+    """
+    (topic, subtopic, messages) for every menu entry matching the filters.
+    Menus may nest; an entry's topic is the menu it's in.
+    """
+    for topic, actions in menu.items():
+        for subtopic, entry in actions.items():
+            if isinstance(entry, dict):
+                yield from select({subtopic: entry}, topics, subtopics)
+            elif (not topics or topic in topics) and (not subtopics or subtopic in subtopics):
+                yield topic, subtopic, entry
+
+
+def file_name(index, topic, subtopic):
+    return f"{index:04d}-{topic.lower().replace(' ', '_')}-{subtopic.lower().replace(' ', '_')}.prn"
+
+
+def render(out_dir, entries, count, oai_client=None, deployment=None):
+    """
+    Render count receipts for each entry into out_dir.
+
+    Args:
+        out_dir: Directory for the spool files (created if needed)
+        entries: Iterable of (topic, subtopic, messages)
+        count: Receipts per entry
+        oai_client: AzureOpenAI client, or None to use offline responses only
+        deployment: Azure OpenAI deployment name
+
+    Returns:
+        List of spool file paths written
+    """
+    from adafruit.Adafruit_Thermal import Adafruit_Thermal
+    from Baiiab import Baiiab
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for topic, subtopic, messages in entries:
+        for i in range(count):
+            path = os.path.join(out_dir, file_name(len(paths) + 1, topic, subtopic))
+            printer = Adafruit_Thermal(spool=path, buffered=True)
+            try:
+                baiiab = Baiiab(printer, oai_client)
+                advice = None
+                if oai_client:
+                    try:
+                        advice = baiiab.create_oai_chat_completion(messages, deployment)
+                    except Exception as e:
+                        logger.error(f"Falling back to offline advice for {subtopic} {topic}: {e}")
+                if advice is None:
+                    advice = baiiab.get_offline_advice(topic, subtopic)
+                baiiab.print_advice_long(advice, subtopic + " " + topic)
+            finally:
+                printer.close()
+            logger.info(f"Rendered {path}: {printer.getStats()['bytes_sent']} bytes")
+            paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render receipts into raw spool files for 'lp -o raw'.")
+    parser.add_argument("-n", "--count", type=int, default=1, help="Receipts per topic/subtopic")
+    parser.add_argument("--topic", action="append", help="Menu topic to render (repeatable; default all)")
+    parser.add_argument("--subtopic", action="append", help="Subtopic to render (repeatable; default all)")
+    parser.add_argument("--out", default=DEFAULT_OUT_DIR, help="Directory for the spool files")
+    parser.add_argument("--offline", action="store_true", help="Use offline responses only")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    entries = list(select(load_menu(), args.topic, args.subtopic))
+    if not entries:
+        parser.error("No menu entries match the given topics/subtopics")
+
+    oai_client = None
+    if not args.offline:
+        from openai import AzureOpenAI
+        oai_client = AzureOpenAI(
+            api_key=os.environ.get("AZURE_OPENAI_API_KEY"),
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            api_version="2024-02-01",
+            timeout=3.0,
+        )
+
+    paths = render(args.out, entries, args.count, oai_client, os.getenv("AZURE_OPENAI_DEPLOYMENT"))
+    print(f"Wrote {len(paths)} receipts to {args.out}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Precompiled receipt segments.
+
+The fixed parts of a receipt (logo, title banner, disclaimer, footer) are
+rendered through the printer driver once, captured as an immutable block of
+ESC/POS bytes, and replayed as a single write on every later receipt. Compiled
+segments are cached in memory and on disk so they survive service restarts.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk format or the way segments are rendered changes
+COMPILER_VERSION = 3
+
+DEFAULT_CACHE_DIR = "cache/receipts"
+
+CompiledSegment = namedtuple("CompiledSegment", ["data", "delay", "state"])
+
+
+class ReceiptCompiler:
+    """Compiles and caches static receipt segments for one printer."""
+
+    def __init__(self, printer, key_parts=(), cache_dir=DEFAULT_CACHE_DIR):
+        """
+        Args:
+            printer: Adafruit_Thermal instance segments are compiled for
+            key_parts: Values the segment contents depend on (e.g. logo
+                name and title); changing any of them recompiles
+            cache_dir: Directory for the on-disk cache, or None to keep
+                segments in memory only
+        """
+        self._printer = printer
+        self._key_parts = tuple(key_parts)
+        self._cache_dir = cache_dir
+        self._segments = {}
+
+    def key(self, name):
+        """Cache key for a segment, covering everything its bytes and timing depend on."""
+        printer = self._printer
+        parts = (COMPILER_VERSION, name) + self._key_parts + (
+            printer.firmwareVersion,
+            printer.rasterSupported,
+            printer.byteTime,
+            printer.dotPrintTime,
+            printer.dotFeedTime,
+        )
+        return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+    def get(self, name, render):
+        """
+        Get a compiled segment, compiling it with render() on a cache miss.
+
+        Args:
+            name: Segment name, e.g. "header"
+            render: Callable issuing the segment's printer commands
+
+        Returns:
+            CompiledSegment
+        """
+        key = self.key(name)
+        segment = self._segments.get(key)
+        if segment is None:
+            segment = self._load(key)
+        if segment is None:
+            self._printer.beginProgram()
+            try:
+                render()
+            finally:
+                segment = CompiledSegment(*self._printer.endProgram())
+            logger.info(f"Compiled receipt segment '{name}': {len(segment.data)} bytes")
+            self._save(key, segment)
+        self._segments[key] = segment
+        return segment
+
+    def play(self, name, render):
+        """Print a segment, compiling it first if it isn't cached."""
+        segment = self.get(name, render)
+        self._printer.printProgram(segment.data, segment.delay, segment.state)
+
+    def _path(self, key):
+        return os.path.join(self._cache_dir, key + ".json")
+
+    def _load(self, key):
+        if not self._cache_dir:
+            return None
+        try:
+            with open(self._path(key), "r") as f:
+                cached = json.load(f)
+            return CompiledSegment(bytes.fromhex(cached["data"]), cached["delay"], cached["state"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable receipt cache {self._path(key)}: {e}")
+            return None
+
+    def _save(self, key, segment):
+        if not self._cache_dir:
+            return
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"data": segment.data.hex(), "delay": segment.delay, "state": segment.state}, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Failed to write receipt cache {self._path(key)}: {e}")
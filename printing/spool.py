@@ -0,0 +1,201 @@
+"""
+Crash-safe print spool.
+
+Each receipt is compiled into its printer program (see
+Adafruit_Thermal.beginProgram()) and journaled here before any of it is sent.
+Once the last byte has gone out and the printer still has paper, the job is
+marked complete. Jobs left incomplete by a crash, power loss or an empty paper
+roll are replayed on the next start, or once paper is back.
+
+The journal is a single append-only file of records:
+
+    header  magic b'BSPL', record type, job id, payload length, CRC-32
+    payload JOB:  delay (float64), metadata length, metadata JSON, program bytes
+            DONE: empty
+
+A JOB record is written with one write() and fsync'd, so the advice that cost
+an API call survives power loss. DONE records are written but not fsync'd:
+losing one to a power cut only means a receipt is printed twice. When no jobs
+are pending the journal is truncated, and when it would grow past max_bytes
+the pending jobs are rewritten into a fresh journal (oldest dropped if they
+still don't fit), so the file stays small and the SD card sees only short
+appends. A job too big for max_bytes on its own isn't journaled at all.
+"""
+
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPOOL_DIR = "cache/spool"
+DEFAULT_MAX_BYTES = 1024 * 1024
+
+JOURNAL = "journal"
+MAGIC = b"BSPL"
+HEADER = struct.Struct("<4sBIII")
+JOB_HEADER = struct.Struct("<dI")
+
+RECORD_JOB = 1
+RECORD_DONE = 2
+
+SpooledJob = namedtuple("SpooledJob", ["id", "meta", "data", "delay", "state"])
+
+
+class PrintSpool:
+    """Append-only journal of print jobs not yet known to be printed."""
+
+    def __init__(self, directory=DEFAULT_SPOOL_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            directory: Directory holding the journal (created if needed)
+            max_bytes: Most the journal may grow to before it's compacted
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._path = os.path.join(directory, JOURNAL)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._next_id = 1
+        self._size = 0
+        self._fd = None
+
+    def open(self):
+        """Open the journal, recovering any jobs left pending."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+            self._recover()
+        if self._pending:
+            logger.info(f"Print spool has {len(self._pending)} unfinished job(s) to replay")
+        return self
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def pending(self):
+        """Jobs not yet marked complete, oldest first."""
+        with self._lock:
+            return [self._pending[job_id] for job_id in sorted(self._pending)]
+
+    def add(self, data, delay, state, meta=None):
+        """
+        Journal a compiled print job before it's sent.
+
+        Args:
+            data, delay, state: The job's program, as returned by
+                Adafruit_Thermal.endProgram()
+            meta: JSON-serializable description of the job (topic etc.)
+
+        Returns:
+            SpooledJob, or None if the job alone is bigger than max_bytes
+            (it's left to the caller to print it unjournaled)
+        """
+        with self._lock:
+            job = SpooledJob(self._next_id, meta, bytes(data), delay, state)
+            payload = self._encode_job(job)
+            if HEADER.size + len(payload) > self.max_bytes:
+                logger.warning(f"Print job {meta} is {HEADER.size + len(payload)} bytes, "
+                               f"more than the print spool's {self.max_bytes}; not journaling it")
+                return None
+            self._next_id += 1
+            if self._size + HEADER.size + len(payload) > self.max_bytes:
+                self._compact(HEADER.size + len(payload))
+            self._append(RECORD_JOB, job.id, payload)
+            os.fsync(self._fd)
+            self._pending[job.id] = job
+        return job
+
+    def complete(self, job):
+        """Mark a job printed; it won't be replayed."""
+        with self._lock:
+            if self._pending.pop(job.id, None) is None:
+                return
+            if self._pending:
+                self._append(RECORD_DONE, job.id, b"")
+            else:
+                # Nothing left to replay: start the journal over
+                os.ftruncate(self._fd, 0)
+                self._size = 0
+
+    def _append(self, kind, job_id, payload):
+        record = self._record(kind, job_id, payload)
+        os.write(self._fd, record)
+        self._size += len(record)
+
+    @staticmethod
+    def _record(kind, job_id, payload):
+        return HEADER.pack(MAGIC, kind, job_id, len(payload), zlib.crc32(payload)) + payload
+
+    @staticmethod
+    def _encode_job(job):
+        meta_json = json.dumps({"meta": job.meta, "state": job.state}).encode("utf-8")
+        return JOB_HEADER.pack(job.delay, len(meta_json)) + meta_json + job.data
+
+    def _recover(self):
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        blob = b""
+        while True:
+            chunk = os.read(self._fd, 65536)
+            if not chunk:
+                break
+            blob += chunk
+
+        offset = 0
+        while offset + HEADER.size <= len(blob):
+            magic, kind, job_id, length, crc = HEADER.unpack_from(blob, offset)
+            payload = blob[offset + HEADER.size:offset + HEADER.size + length]
+            if magic != MAGIC or len(payload) != length or zlib.crc32(payload) != crc:
+                break
+            if kind == RECORD_JOB:
+                self._pending[job_id] = self._decode_job(job_id, payload)
+            elif kind == RECORD_DONE:
+                self._pending.pop(job_id, None)
+            self._next_id = max(self._next_id, job_id + 1)
+            offset += HEADER.size + length
+
+        if offset < len(blob):
+            # A write cut short by a crash; everything before it is intact
+            logger.warning(f"Discarding {len(blob) - offset} bytes of incomplete print spool record")
+            os.ftruncate(self._fd, offset)
+        self._size = offset
+        if not self._pending and self._size:
+            os.ftruncate(self._fd, 0)
+            self._size = 0
+
+    def _decode_job(self, job_id, payload):
+        delay, meta_length = JOB_HEADER.unpack_from(payload)
+        start = JOB_HEADER.size
+        info = json.loads(payload[start:start + meta_length].decode("utf-8"))
+        return SpooledJob(job_id, info["meta"], payload[start + meta_length:], delay, info["state"])
+
+    def _compact(self, reserve):
+        """Rewrite the journal with only the pending jobs, dropping the oldest to fit reserve more bytes."""
+        records = [(job_id, self._record(RECORD_JOB, job_id, self._encode_job(self._pending[job_id])))
+                   for job_id in sorted(self._pending)]
+        while records and sum(len(r) for _, r in records) + reserve > self.max_bytes:
+            job_id, _ = records.pop(0)
+            logger.warning(f"Print spool full; dropping unfinished job {self._pending.pop(job_id).meta}")
+
+        tmp_path = self._path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(r for _, r in records))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path)
+        os.close(self._fd)
+        self._fd = os.open(self._path, os.O_RDWR | os.O_APPEND)
+        self._size = sum(len(r) for _, r in records)
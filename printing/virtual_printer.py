@@ -0,0 +1,493 @@
+"""
+Virtual thermal printer for benchmarking without hardware.
+
+Opens a pseudo-terminal that Adafruit_Thermal can use as its serial port, and
+plays the part of the printer on the other end: bytes arrive no faster than the
+configured baud rate, are queued in a receive buffer of limited size, and are
+executed by a print engine that takes as long as the real mechanism would to
+print and feed paper, with print speed following the heat settings and density
+the driver sends and the number of dots in each line. Per job it reports bytes received, buffer overruns (bytes
+the real printer would have dropped), idle gaps where the printer sat waiting
+for data, and total wall time.
+
+Usage:
+    python -m printing.virtual_printer
+    # then point the driver at the printed port, e.g.
+    # Adafruit_Thermal("/dev/pts/3", 19200)
+"""
+
+import fcntl
+import logging
+import os
+import select
+import struct
+import termios
+import threading
+import time
+import tty
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+ESC = 27
+GS = 29
+DC2 = 18
+
+DOTS_PER_LINE = 384
+HEAT_DOTS_UNIT = 8        # ESC 7 n1: max heating dots is 8 * (n1 + 1)
+HEAT_TIME_UNIT = 10e-6    # ESC 7 n2 and n3 are in units of 10 us
+BREAK_TIME_UNIT = 250e-6  # DC2 # n: D7..D5 of n are in units of 250 us
+
+# Fixed-length commands: (prefix, command byte) -> number of argument bytes
+COMMAND_ARGS = {
+    (ESC, 32): 1,   # ESC SP n    character spacing
+    (ESC, 33): 1,   # ESC ! n     print mode
+    (ESC, 45): 1,   # ESC - n     underline
+    (ESC, 51): 1,   # ESC 3 n     line height
+    (ESC, 55): 3,   # ESC 7 n1 n2 n3  heat settings
+    (ESC, 56): 2,   # ESC 8 n1 n2 sleep (firmware >= 2.64)
+    (ESC, 61): 1,   # ESC = n     online / offline
+    (ESC, 64): 0,   # ESC @       initialize
+    (ESC, 74): 1,   # ESC J n     feed rows
+    (ESC, 82): 1,   # ESC R n     charset
+    (ESC, 97): 1,   # ESC a n     justify
+    (ESC, 100): 1,  # ESC d n     feed lines
+    (ESC, 116): 1,  # ESC t n     code page
+    (ESC, 118): 1,  # ESC v n     status / sleep off
+    (GS, 33): 1,    # GS ! n      character size
+    (GS, 66): 1,    # GS B n      inverse
+    (GS, 72): 1,    # GS H n      barcode label position
+    (GS, 104): 1,   # GS h n      barcode height
+    (GS, 114): 1,   # GS r n      status
+    (GS, 119): 1,   # GS w n      barcode width
+    (DC2, 35): 1,   # DC2 # n     density
+    (DC2, 84): 0,   # DC2 T       test page
+}
+
+# end_job() checks this many times, 20 ms apart, that nothing is pending
+DRAIN_SETTLE_CHECKS = 5
+
+PRINT_MODE_DOUBLE_HEIGHT = 1 << 4
+PRINT_MODE_DOUBLE_WIDTH = 1 << 5
+
+
+class VirtualPrinter:
+    """A pty-backed stand-in for the thermal printer."""
+
+    def __init__(self, baudrate=19200, buffer_size=4096, motor_row_time=0.0021,
+                 feed_row_time=0.0021, text_fill=0.2, idle_threshold=0.005,
+                 job_timeout=1.0, paper=True):
+        """
+        Args:
+            baudrate: Serial speed; bytes are accepted no faster than this
+            buffer_size: Receive buffer size in bytes; data arriving when it
+                is full is counted as an overrun and dropped
+            motor_row_time: Fastest the mechanism can advance one printed dot row
+            feed_row_time: Time to feed one blank dot row
+            text_fill: Fraction of dots heated in a row of text, used to
+                estimate heating time for text lines
+            idle_threshold: Engine waits for data longer than this count as idle gaps
+            job_timeout: Idle time after which the current job is considered
+                done, or None to delimit jobs only with begin_job()/end_job()
+            paper: Paper status reported to status queries
+        """
+        self.baudrate = baudrate
+        self.byte_time = 11.0 / baudrate  # Start, 8 data, stop and idle bits
+        self.buffer_size = buffer_size
+        self.motor_row_time = motor_row_time
+        self.feed_row_time = feed_row_time
+        self.text_fill = text_fill
+        self.idle_threshold = idle_threshold
+        self.job_timeout = job_timeout
+        self.paper = paper
+
+        self.port = None
+        self.jobs = []
+        self._master = None
+        self._slave = None
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._running = False
+        self._receiving = False
+        self._waiting = False
+        self._threads = []
+        self._job = None
+        self._job_done = threading.Condition(self._cond)
+        self._reset_settings()
+
+    # --- Lifecycle ---
+
+    def open(self):
+        """Create the pty and start the printer. Returns the port path."""
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._master)
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._receive_loop, name="vprinter-rx", daemon=True),
+            threading.Thread(target=self._engine_loop, name="vprinter-engine", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Virtual printer listening on {self.port}")
+        return self.port
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def begin_job(self):
+        """Start a new job explicitly, ending any job in progress."""
+        with self._cond:
+            if self._job is not None:
+                self._finish_job()
+            self._start_job()
+
+    def end_job(self, timeout=None):
+        """
+        Wait until everything sent so far has been printed, then end the
+        current job and return its stats (None if no job was in progress).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            # Data just written to the pty takes a moment to show up on
+            # this side, so it has to stay drained for a while
+            settled = 0
+            while settled < DRAIN_SETTLE_CHECKS:
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                settled = settled + 1 if self._drained() else 0
+                self._cond.wait(0.02)
+            if self._job is None:
+                return None
+            self._finish_job()
+            return self.jobs[-1]
+
+    def wait_job(self, timeout=None):
+        """
+        Wait for the job in progress (or the next one) to finish and return its stats.
+
+        Jobs end on their own once the printer has been idle for job_timeout
+        seconds. Returns None on timeout.
+        """
+        with self._cond:
+            count = len(self.jobs)
+            self._job_done.wait_for(lambda: len(self.jobs) > count, timeout)
+            return self.jobs[-1] if len(self.jobs) > count else None
+
+    # --- Receive side: serial line and input buffer ---
+
+    def _drained(self):
+        """True when no data is pending anywhere and the engine is waiting for more."""
+        if self._buffer or self._receiving or not self._waiting:
+            return False
+        pending = struct.unpack("i", fcntl.ioctl(self._master, termios.FIONREAD, b"\0" * 4))[0]
+        return pending == 0
+
+    def _receive_loop(self):
+        next_arrival = 0.0
+        while self._running:
+            ready, _, _ = select.select([self._master], [], [], 0.1)
+            if not ready:
+                continue
+            self._receiving = True
+            try:
+                data = os.read(self._master, 64)
+            except OSError:
+                break
+            # Bytes can't arrive faster than the baud rate allows
+            now = time.monotonic()
+            next_arrival = max(next_arrival, now) + len(data) * self.byte_time
+            if next_arrival > now:
+                time.sleep(next_arrival - now)
+            with self._cond:
+                self._start_job()
+                job = self._job
+                if job["start"] is None:
+                    job["start"] = time.monotonic()
+                job["bytes"] += len(data)
+                space = self.buffer_size - len(self._buffer)
+                if len(data) > space:
+                    job["overruns"] += len(data) - max(space, 0)
+                    data = data[:max(space, 0)]
+                self._buffer.extend(data)
+                self._receiving = False
+                self._cond.notify_all()
+
+    def _start_job(self):
+        if self._job is None:
+            self._job = {
+                "start": None,
+                "end": None,
+                "bytes": 0,
+                "overruns": 0,
+                "idle_gaps": 0,
+                "idle_time": 0.0,
+                "busy_time": 0.0,
+                "lines": 0,
+                "bitmap_rows": 0,
+                "feed_rows": 0,
+                "status_queries": 0,
+            }
+
+    def _finish_job(self):
+        job = self._job
+        self._job = None
+        now = time.monotonic()
+        if job["start"] is None:
+            job["start"] = now
+        if job["end"] is None:
+            job["end"] = max(job["start"], now if job["bytes"] else job["start"])
+        job["wall_time"] = job["end"] - job["start"]
+        self.jobs.append(job)
+        logger.info("Virtual printer job: " + format_job(job))
+        self._job_done.notify_all()
+
+    def _read_byte(self):
+        """Block until a byte is available; returns None on shutdown."""
+        with self._cond:
+            if not self._buffer:
+                waited_from = time.monotonic()
+                job = self._job
+                self._waiting = True
+                self._cond.notify_all()
+                while not self._buffer:
+                    if not self._running:
+                        return None
+                    timeout = 0.1
+                    if self._job is not None and self.job_timeout is not None:
+                        timeout = waited_from + self.job_timeout - time.monotonic()
+                        if timeout <= 0:
+                            self._finish_job()
+                            continue
+                    self._cond.wait(timeout)
+                self._waiting = False
+                # Only waits in the middle of a job (after it has started
+                # printing and before it ended) count as idle gaps
+                idle = time.monotonic() - waited_from
+                if (job is not None and job is self._job and job["end"] is not None
+                        and idle > self.idle_threshold):
+                    job["idle_gaps"] += 1
+                    job["idle_time"] += idle
+            return self._buffer.popleft()
+
+    def _read_bytes(self, n):
+        data = bytearray()
+        for _ in range(n):
+            b = self._read_byte()
+            if b is None:
+                break
+            data.append(b)
+        return data
+
+    def _respond(self, data):
+        os.write(self._master, bytes(data))
+
+    # --- Print engine ---
+
+    def _reset_settings(self):
+        self.heat_dots = HEAT_DOTS_UNIT * (7 + 1)
+        self.heat_time = 80 * HEAT_TIME_UNIT
+        self.heat_interval = 2 * HEAT_TIME_UNIT
+        self.break_time = 0.0
+        self.print_mode = 0
+        self.size = 0
+        self.line_height = 32
+        self.column = 0
+
+    def _char_height(self):
+        if self.print_mode & PRINT_MODE_DOUBLE_HEIGHT or self.size & 0x0F:
+            return 48
+        return 24
+
+    def _max_column(self):
+        if self.print_mode & PRINT_MODE_DOUBLE_WIDTH or self.size & 0xF0:
+            return 16
+        return 32
+
+    def row_time(self, dots):
+        """Time to print one dot row with the given number of heated dots."""
+        passes = max(1, -(-dots // self.heat_dots))
+        heating = passes * self.heat_time + self.heat_interval + self.break_time
+        return max(self.motor_row_time, heating)
+
+    def _run(self, duration):
+        """Occupy the mechanism for a physical operation."""
+        if duration <= 0:
+            return
+        time.sleep(duration)
+        with self._cond:
+            if self._job is not None:
+                self._job["busy_time"] += duration
+                self._job["end"] = time.monotonic()
+
+    def _mark(self):
+        with self._cond:
+            if self._job is not None:
+                self._job["end"] = time.monotonic()
+
+    def _count(self, key, n=1):
+        with self._cond:
+            if self._job is not None:
+                self._job[key] += n
+
+    def _print_line(self):
+        height = self._char_height()
+        dots = int(DOTS_PER_LINE * self.text_fill)
+        feed = max(self.line_height - 24, 0)
+        self._run(height * self.row_time(dots) + feed * self.feed_row_time)
+        self._count("lines")
+        self.column = 0
+
+    def _feed_rows(self, rows):
+        self._run(rows * self.feed_row_time)
+        self._count("feed_rows", rows)
+        self.column = 0
+
+    def _print_bitmap_rows(self, rows, row_bytes, scale_x=1, scale_y=1):
+        """Read and print a bitmap a row at a time, as the mechanism takes
+        them, so rows not yet printed keep taking up buffer space.
+        """
+        due = time.monotonic()
+        for _ in range(rows):
+            row = self._read_bytes(row_bytes)
+            if len(row) < row_bytes:
+                break  # Shutting down
+            # A row can't start before its data is in, nor before the last
+            # one is done; sleeping to a deadline keeps sleep() overhead
+            # from adding up over hundreds of rows
+            duration = scale_y * self.row_time(scale_x * sum(bin(b).count("1") for b in row))
+            due = max(due, time.monotonic()) + duration
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            with self._cond:
+                if self._job is not None:
+                    self._job["busy_time"] += duration
+                    self._job["end"] = time.monotonic()
+                    self._job["bitmap_rows"] += scale_y
+
+    def _engine_loop(self):
+        while self._running:
+            b = self._read_byte()
+            if b is None:
+                return
+            self._execute(b)
+            self._mark()
+
+    def _execute(self, b):
+        if b in (ESC, GS, DC2):
+            cmd = self._read_byte()
+            if cmd is None:
+                return
+            self._command(b, cmd)
+        elif b == 10:
+            self._print_line()
+        elif b == 12:
+            self._print_line()
+        elif b == 9:
+            self.column = (self.column + 4) & 0xFC
+        elif b >= 32 and b != 255:
+            self.column += 1
+            if self.column >= self._max_column():
+                self._print_line()
+
+    def _command(self, prefix, cmd):
+        if (prefix, cmd) == (ESC, 68):
+            # ESC D n1 ... NUL: tab stops
+            while self._read_byte() not in (0, None):
+                pass
+            return
+        if (prefix, cmd) == (DC2, 42):
+            # DC2 * r n d1...dn: bitmap chunk of r rows, n bytes per row
+            rows, row_bytes = self._read_bytes(2)
+            self._print_bitmap_rows(rows, row_bytes)
+            return
+        if (prefix, cmd) == (GS, 118):
+            # GS v 0 m xL xH yL yH d1...dk: raster image, m scales it
+            # (bit 0 double width, bit 1 double height)
+            _, mode, xl, xh, yl, yh = self._read_bytes(6)
+            row_bytes, rows = xl + (xh << 8), yl + (yh << 8)
+            self._print_bitmap_rows(rows, row_bytes, 2 if mode & 1 else 1, 2 if mode & 2 else 1)
+            return
+        if (prefix, cmd) == (GS, 107):
+            self._barcode()
+            return
+
+        args = self._read_bytes(COMMAND_ARGS.get((prefix, cmd), 0))
+        if (prefix, cmd) == (ESC, 64):
+            self._reset_settings()
+        elif (prefix, cmd) == (ESC, 55):
+            self.heat_dots = HEAT_DOTS_UNIT * (args[0] + 1)
+            self.heat_time = args[1] * HEAT_TIME_UNIT
+            self.heat_interval = args[2] * HEAT_TIME_UNIT
+        elif (prefix, cmd) == (DC2, 35):
+            self.break_time = (args[0] >> 5) * BREAK_TIME_UNIT
+        elif (prefix, cmd) == (ESC, 33):
+            self.print_mode = args[0]
+        elif (prefix, cmd) == (GS, 33):
+            self.size = args[0]
+        elif (prefix, cmd) == (ESC, 51):
+            self.line_height = args[0]
+        elif (prefix, cmd) == (ESC, 74):
+            self._feed_rows(args[0])
+        elif (prefix, cmd) == (ESC, 100):
+            self._feed_rows(args[0] * (self._char_height() + max(self.line_height - 24, 0)))
+        elif (prefix, cmd) in ((ESC, 118), (GS, 114)):
+            self._count("status_queries")
+            self._respond([0x00 if self.paper else 0x04])
+        elif (prefix, cmd) == (DC2, 84):
+            self._run(26 * (24 * self.row_time(int(DOTS_PER_LINE * self.text_fill)) +
+                            6 * self.feed_row_time) + 30 * self.feed_row_time)
+
+    def _barcode(self):
+        # GS k m: firmware >= 2.64 uses m >= 65 followed by a length byte;
+        # older firmware sends a NUL-terminated string
+        m = self._read_byte()
+        if m is None:
+            return
+        if m >= 65:
+            length = self._read_byte() or 0
+            self._read_bytes(length)
+        else:
+            while self._read_byte() not in (0, None):
+                pass
+        self._run(90 * self.row_time(int(DOTS_PER_LINE * 0.5)))
+
+
+def format_job(job):
+    """One-line summary of a job's stats."""
+    return (f"wall={job['wall_time']:.3f}s busy={job['busy_time']:.3f}s "
+            f"bytes={job['bytes']} overruns={job['overruns']} "
+            f"idle_gaps={job['idle_gaps']} idle={job['idle_time']:.3f}s "
+            f"lines={job['lines']} bitmap_rows={job['bitmap_rows']} feed_rows={job['feed_rows']}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    with VirtualPrinter() as printer:
+        print(f"Virtual printer on {printer.port} (Ctrl+C to quit)", flush=True)
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Background print-job worker.
+
+Generating and printing a receipt takes several seconds. Jobs are handed to a
+single worker thread that owns the printer, so input callbacks return
+immediately and the menu stays responsive. Presses that arrive while the
+worker is busy are handled according to a policy:
+
+    drop      ignore new jobs while a job is queued or printing
+    coalesce  keep at most one job waiting; a newer press replaces it
+    queue     queue up to max_queue jobs, dropping any beyond that
+"""
+
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("drop", "coalesce", "queue")
+
+
+class PrintJob:
+    def __init__(self, messages, topic, subtopic):
+        self.messages = messages
+        self.topic = topic
+        self.subtopic = subtopic
+
+    def __repr__(self):
+        return f'PrintJob(\'{self.subtopic} {self.topic}\')'
+
+
+class PrintWorker:
+    """Runs print jobs one at a time on a dedicated thread."""
+
+    def __init__(self, handler, policy="queue", max_queue=3, on_status=None):
+        """
+        Args:
+            handler: Called with each PrintJob on the worker thread
+            policy: One of POLICIES, applied to jobs submitted while busy
+            max_queue: Most jobs waiting behind the active one ("queue" policy)
+            on_status: Optional callback(event, job, depth) for progress
+                reporting, where event is "queued", "dropped", "started",
+                "finished" or "failed" and depth is the number of jobs
+                queued or printing. Called on the submitting thread for
+                "queued"/"dropped" and on the worker thread otherwise.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown print queue policy '{policy}' (expected one of {POLICIES})")
+        self._handler = handler
+        self.policy = policy
+        self.max_queue = max_queue
+        self._on_status = on_status
+        self._pending = deque()
+        self._active = None
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    @property
+    def depth(self):
+        """Number of jobs queued or printing."""
+        with self._cond:
+            return len(self._pending) + (1 if self._active else 0)
+
+    @property
+    def busy(self):
+        return self.depth > 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="print-worker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop after the active job; jobs still queued are discarded."""
+        with self._cond:
+            self._running = False
+            self._pending.clear()
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def submit(self, job):
+        """
+        Offer a job to the worker.
+
+        Returns:
+            True if the job was queued, False if the policy dropped it
+        """
+        with self._cond:
+            busy = self._active is not None or len(self._pending) > 0
+            if self.policy == "drop" and busy:
+                accepted = False
+            elif self.policy == "coalesce" and self._pending:
+                replaced = self._pending.pop()
+                logger.info(f"Print job {replaced} replaced by {job}")
+                self._pending.append(job)
+                accepted = True
+            elif self.policy == "queue" and len(self._pending) >= self.max_queue:
+                accepted = False
+            else:
+                self._pending.append(job)
+                accepted = True
+            depth = len(self._pending) + (1 if self._active else 0)
+            self._cond.notify_all()
+
+        if accepted:
+            logger.info(f"Print job {job} queued (depth={depth})")
+        else:
+            logger.info(f"Print job {job} dropped (policy={self.policy}, depth={depth})")
+        self._status("queued" if accepted else "dropped", job, depth)
+        return accepted
+
+    def _status(self, event, job, depth):
+        if not self._on_status:
+            return
+        try:
+            self._on_status(event, job, depth)
+        except Exception:
+            logger.exception(f"Print status callback failed for {event} {job}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                job = self._active = self._pending.popleft()
+                depth = len(self._pending) + 1
+
+            self._status("started", job, depth)
+            event = "finished"
+            try:
+                self._handler(job)
+            except Exception:
+                logger.exception(f"Print job {job} failed")
+                event = "failed"
+
+            with self._cond:
+                self._active = None
+                depth = len(self._pending)
+            self._status(event, job, depth)
@@ -1,20 +1,31 @@
 #!/usr/bin/python
 
+import time
+# Startup time (see record_menu_shown()) counts from here, imports included
+service_started = time.monotonic()
+
 from dotenv import load_dotenv
 from adafruit.Adafruit_Thermal import *
-from Baiiab import Baiiab
 from lcd.i2c_lcd import I2cLcd # Example LCD interface used
-from lcd.lcd_menu_screen import Menu, MenuAction, MenuNoop, MenuScreen
+from lcd.lcd_menu_screen import Menu, MenuAction, MenuNoop, MenuScreen, build_menu
+from lcd.input_loop import InputLoop, parse_acceleration
+from lcd.renderer import LcdRenderer
+from lcd.glyphs import SPINNER
+from printing.worker import PrintJob, PrintWorker
+from printing.spool import PrintSpool
+from printing.batch import load_menu
 from gpiozero import Button, RotaryEncoder
 from functools import partial
 from ast import literal_eval
-import time, os, logging
+import time, os, logging, threading
 from logging.handlers import TimedRotatingFileHandler
-from openai import AzureOpenAI
 
 load_dotenv()
 
 # Initialize OpenTelemetry
+input_latency_histogram = None
+lcd_init_histogram = None
+startup_histogram = None
 try:
     from otel import setup_from_env, get_tracer
     tracer, meter = setup_from_env()
@@ -47,6 +58,21 @@ try:
             description="Menu navigation events",
             unit="1"
         )
+        input_latency_histogram = meter.create_histogram(
+            "baiiab.input_latency",
+            description="Time from an encoder or button event to the LCD showing it",
+            unit="ms"
+        )
+        lcd_init_histogram = meter.create_histogram(
+            "baiiab.lcd.init_time",
+            description="Time to initialize the LCD at startup",
+            unit="ms"
+        )
+        startup_histogram = meter.create_histogram(
+            "baiiab.startup.menu_time",
+            description="Time from the service starting to the menu being on the LCD",
+            unit="ms"
+        )
 except ImportError:
     service_tracer = None
     interaction_counter = None
@@ -56,15 +82,26 @@ except ImportError:
 logging.basicConfig(encoding='utf-8', level=logging.DEBUG,
                     handlers=[TimedRotatingFileHandler("/home/pi/baiiab/logs/baiiab.log", when="H", interval=1)])
 
-#printer = Adafruit_Thermal("/dev/serial0", 19200, timeout=5)
-printer = Adafruit_Thermal("/dev/ttyS0", 19200, timeout=5)
-
 # Example config for LCD via i2c, you will need this 
 # for the menu to function, the screen size is required
 # to render the menu correctly on the screen.
 DEFAULT_I2C_ADDR = 0x27
-lcd = I2cLcd(1, DEFAULT_I2C_ADDR, 4, 20)
+# LCD_STATE_FILE remembers that the LCD is set up, so a restart within the
+# same boot skips its power-up wait and clearing (empty to always cold start)
+lcd = I2cLcd(1, DEFAULT_I2C_ADDR, 4, 20,
+             state_file=os.getenv("LCD_STATE_FILE", "/dev/shm/baiiab-lcd") or None)
+logging.info(f"LCD initialized in {lcd.init_time * 1000:.1f} ms ({'warm' if lcd.warm_start else 'cold'} start)")
+if lcd_init_histogram:
+    lcd_init_histogram.record(lcd.init_time * 1000, {"start": "warm" if lcd.warm_start else "cold"})
+# From here on only the render thread talks to the LCD; the menu and print
+# status hand it whole screens, capped at LCD_MAX_FPS frames a second
+renderer = LcdRenderer(lcd, max_fps=float(os.getenv("LCD_MAX_FPS", "20"))).start()
+
 
+# The screen changes from the UI thread and the print worker; serialize
+# them so one doesn't draw over the other half way. The encoder and button
+# callbacks only post events to the UI thread (see lcd/input_loop.py).
+lcd_lock = threading.RLock()
 
 def clockwise_cb():
     logging.debug("prev")
@@ -73,9 +110,9 @@ def clockwise_cb():
             menu_navigation_counter.add(1, {"interaction_type": "navigation_up"})
             interaction_counter.add(1, {"interaction_type": "navigation_up"})
             up_counter.add(1)
-            screen.focus_prev()
+            input_loop.rotate(-1)
     else:
-        screen.focus_prev()
+        input_loop.rotate(-1)
 
 def counter_clockwise_cb():
     logging.debug("next")
@@ -84,9 +121,9 @@ def counter_clockwise_cb():
             menu_navigation_counter.add(1, {"interaction_type": "navigation_down"})
             interaction_counter.add(1, {"interaction_type": "navigation_down"})
             down_counter.add(1)
-            screen.focus_next()
+            input_loop.rotate(1)
     else:
-        screen.focus_next()
+        input_loop.rotate(1)
 
 def button_cb():
     logging.debug("push")
@@ -95,12 +132,16 @@ def button_cb():
             menu_navigation_counter.add(1, {"interaction_type": "select"})
             interaction_counter.add(1, {"interaction_type": "select"})
             select_counter.add(1)
-            screen.choose()
+            input_loop.press()
     else:
-        screen.choose()
+        input_loop.press()
+
+def record_input_latency(seconds, kind):
+    if input_latency_histogram:
+        input_latency_histogram.record(seconds * 1000, {"interaction_type": kind})
 
 def action_callback(messages, menu_screen, title):
-    topic = menu_screen.parent.title
+    topic = menu_screen.topic
     subtopic = title
     logging.info("callback action chosen.  topic=" + topic + ";subtopic=" + subtopic)
     
@@ -109,14 +150,25 @@ def action_callback(messages, menu_screen, title):
             span.set_attribute("topic", topic)
             span.set_attribute("subtopic", subtopic)
             interaction_counter.add(1, {"interaction_type": "action_selected", "topic": topic, "subtopic": subtopic})
-            
-            columns = menu_screen.columns
-            menu_screen.lcd.clear()
-            menu_screen.lcd.move_to(0, 0)
-            menu_screen.lcd.putstr("PRINTING YOU A:\n".center(columns) + subtopic.center(columns) + "\n" + topic.center(columns))
-            
+            accepted = print_worker.submit(PrintJob(messages, topic, subtopic))
+            span.set_attribute("print_job_accepted", accepted)
+    else:
+        print_worker.submit(PrintJob(messages, topic, subtopic))
+
+def print_job(job):
+    """Generates and prints one receipt; runs on the print worker thread."""
+    if job.messages is None:
+        # Replay of the print spool, queued at startup
+        replay_spool()
+        return
+    topic = job.topic
+    subtopic = job.subtopic
+    if service_tracer:
+        with service_tracer.start_as_current_span("print_job") as span:
+            span.set_attribute("topic", topic)
+            span.set_attribute("subtopic", subtopic)
             try:
-                advice = baiiab.create_oai_chat_completion(messages, azure_openai_deployment)
+                advice = baiiab.create_oai_chat_completion(job.messages, azure_openai_deployment)
                 span.set_attribute("response_source", "api")
             except Exception as e:
                 logging.error("GOT EXCEPTION: %s", str(e))
@@ -125,20 +177,159 @@ def action_callback(messages, menu_screen, title):
                 advice = baiiab.get_offline_advice(topic, subtopic)
                 baiiab.print_offline()
             
-            baiiab.print_advice_long(advice, subtopic + " " + topic)
+            print_spooled(advice, topic, subtopic)
     else:
-        columns = menu_screen.columns
-        menu_screen.lcd.clear()
-        menu_screen.lcd.move_to(0, 0)
-        menu_screen.lcd.putstr("PRINTING YOU A:\n".center(columns) + subtopic.center(columns) + "\n" + topic.center(columns))
         try:
-            advice = baiiab.create_oai_chat_completion(messages, azure_openai_deployment)
+            advice = baiiab.create_oai_chat_completion(job.messages, azure_openai_deployment)
         except:
             logging.error("GOT EXCEPTION")
             advice = baiiab.get_offline_advice(topic, subtopic)
             baiiab.print_offline()
 
-        baiiab.print_advice_long(advice, subtopic + " " + topic)
+        print_spooled(advice, topic, subtopic)
+
+def print_spooled(advice, topic, subtopic):
+    """Journals the compiled receipt before printing it, so it survives a crash or an empty roll."""
+    has_paper = replay_spool()
+    segment = baiiab.compile_advice_long(advice, (subtopic + " " + topic).strip())
+    spooled = print_spool.add(segment.data, segment.delay, segment.state,
+                              {"topic": topic, "subtopic": subtopic})
+    if spooled is None:
+        # Too big for the spool; print it anyway, without the safety net
+        if has_paper:
+            baiiab.print_compiled(segment)
+        else:
+            logging.warning(f"Printer out of paper; dropping receipt for {subtopic} {topic}")
+        return
+    if not has_paper:
+        logging.warning(f"Printer out of paper; receipt for {subtopic} {topic} will be printed once it's refilled")
+        return
+    baiiab.print_compiled(segment)
+    if printer_has_paper():
+        print_spool.complete(spooled)
+    else:
+        logging.warning(f"Printer out of paper; receipt for {subtopic} {topic} will be reprinted")
+
+def replay_spool():
+    """Reprints receipts left unfinished by a crash or an empty paper roll,
+    oldest first, stopping if the paper runs out. Returns whether the
+    printer has paper."""
+    has_paper = printer_has_paper()
+    for spooled in print_spool.pending():
+        if not has_paper:
+            break
+        logging.info(f"Replaying spooled receipt {spooled.id}: {spooled.meta}")
+        baiiab.print_compiled(spooled, "replay")
+        has_paper = printer_has_paper()
+        if has_paper:
+            print_spool.complete(spooled)
+    if not has_paper:
+        logging.warning(f"Printer out of paper; {len(print_spool.pending())} receipt(s) waiting")
+    return has_paper
+
+def printer_has_paper():
+    # The paper sensor can only be read with the printer's TX line wired to
+    # the Pi's RX, so it's only checked with PRINTER_PAPER_SENSOR set. Without
+    # a reading an empty roll can't be told from a full one, so receipts are
+    # taken as printed (the spool still covers crashes).
+    if not paper_sensor:
+        return True
+    has_paper = printer.hasPaper()
+    if has_paper is None:
+        global paper_status_logged
+        if not paper_status_logged:
+            logging.warning("Printer doesn't report paper status; receipts printed into an empty roll won't be reprinted")
+            paper_status_logged = True
+        return True
+    return has_paper
+
+# Whether printer_has_paper() has logged that paper status isn't available
+paper_status_logged = False
+paper_sensor = os.getenv("PRINTER_PAPER_SENSOR", "false").lower() == "true"
+
+def record_menu_shown(shown):
+    """Reports how long after starting the menu reached the LCD."""
+    ms = (shown - service_started) * 1000
+    logging.info(f"Menu on the LCD {ms:.0f} ms after startup")
+    if startup_histogram:
+        startup_histogram.record(ms, {"lcd_start": "warm" if lcd.warm_start else "cold"})
+
+def print_status(event, job, depth):
+    """Shows print worker progress on the LCD. The menu is inactive until the
+    worker is idle: the knob still moves the focus and presses still queue
+    receipts, but only the status screen is drawn, and the menu comes back
+    without the spinner."""
+    global print_screen
+    columns = screen.columns
+    with lcd_lock:
+        if event == "started":
+            screen.active = False
+            print_screen = ["PRINTING YOU A:".center(columns), job.subtopic.center(columns),
+                            job.topic.center(columns), ""]
+            # A sign of life while the advice is generated and printed; the
+            # render thread keeps it turning
+            renderer.animate(columns - 1, 0, SPINNER)
+        if event in ("started", "queued") and depth > 1 and print_screen:
+            print_screen[3] = f"+{depth - 1} in queue".center(columns)
+        elif event in ("finished", "failed") and depth == 0:
+            print_screen = None
+            renderer.stop_animation()
+            screen.active = True
+            screen.render()
+        if print_screen:
+            renderer.show(print_screen)
+
+# What print_status() shows while a receipt is printing
+print_screen = None
+
+# Receipts are journaled here until printed; PRINT_SPOOL_MAX_BYTES bounds its size
+print_spool = PrintSpool(os.getenv("PRINT_SPOOL_DIR", "cache/spool"),
+                         max_bytes=int(os.getenv("PRINT_SPOOL_MAX_BYTES", str(1024 * 1024)))).open()
+
+# The worker owns the printer; PRINT_QUEUE_POLICY decides what happens to
+# presses while a receipt is printing (drop, coalesce or queue)
+print_worker = PrintWorker(print_job,
+                           policy=os.getenv("PRINT_QUEUE_POLICY", "queue"),
+                           max_queue=int(os.getenv("PRINT_QUEUE_SIZE", "3")),
+                           on_status=print_status)
+
+# Two title lines leave the rest of the LCD for options
+screen = MenuScreen(renderer, "Welcome to", os.getenv("TITLE"),
+                    build_menu(load_menu(), action_callback, lcd.num_columns, lcd.num_lines - 2))
+screen.start()
+renderer.when_shown(record_menu_shown)
+input_loop = InputLoop(screen, lcd_lock,
+                       acceleration=parse_acceleration(os.getenv("ENCODER_ACCELERATION")),
+                       on_latency=record_input_latency).start()
+
+if print_spool.pending():
+    # Unfinished receipts from before a restart go out ahead of new presses
+    print_worker.submit(PrintJob(None, "receipts", "Unfinished"))
+
+# Only hook up the encoder and button once there's an input loop to post to
+# Edges closer together than ENCODER_BOUNCE_TIME are ignored, so detents come
+# at most about one per 2 * ENCODER_BOUNCE_TIME (see ENCODER_ACCELERATION)
+encoder = RotaryEncoder(10,9, bounce_time=float(os.getenv("ENCODER_BOUNCE_TIME", "0.1")))
+button = Button(11)
+
+encoder.when_rotated_clockwise = counter_clockwise_cb  # backwards for some reason
+encoder.when_rotated_counter_clockwise = clockwise_cb
+button.when_pressed = button_cb
+
+# The menu is up and presses queue for the print worker; the rest can take
+# a few seconds on a Pi (the OpenAI client's imports, the printer's cold boot
+# wait), so it's done after rather than keep the LCD blank
+from openai import AzureOpenAI
+from Baiiab import Baiiab
+
+#printer = Adafruit_Thermal("/dev/serial0", 19200, timeout=5)
+# PRINTER_FLOW_CONTROL may be 'status' (needs the printer's TX wired to the Pi's RX)
+# or 'hardware' (needs the printer's DTR wired to the Pi's CTS)
+printer = Adafruit_Thermal("/dev/ttyS0", 19200, timeout=5, buffered=True,
+                           flowcontrol=os.getenv("PRINTER_FLOW_CONTROL") or None)
+# Per-unit timing from helpers/printer-calibrate.py, if this box has been calibrated
+if not printer.loadTimes("conf/printer.ini"):
+    logging.info("No printer calibration found; using default print timing")
 
 oai_client = AzureOpenAI(
     # This is the default and can be omitted
@@ -151,15 +342,5 @@ azure_openai_deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
 
 baiiab = Baiiab(printer, oai_client)
 
-encoder = RotaryEncoder(10,9, bounce_time=0.1)
-button = Button(11)
-
-
-encoder.when_rotated_clockwise = counter_clockwise_cb  # backwards for some reason
-encoder.when_rotated_counter_clockwise = clockwise_cb
-button.when_pressed = button_cb
-
-time.sleep(5) # Wait for 1 core system to catch up
-screen = MenuScreen(lcd, "Welcome to", os.getenv("TITLE"), baiiab.get_menu(action_callback))
-screen.start()
+print_worker.start()
 time.sleep(10000000)
\ No newline at end of file